@@ -3,8 +3,12 @@ from src.state import AgentState
 from src.tools.market_tools import toolkit
 import os
 from src.llm_utils import get_llm
+from src.prefetch import get_prefetched
+from src.budget import get_current_budget, invoke_within_budget, DeadlineExceeded
+from src import memo
+from src.config import config
 
-from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.messages import AIMessage, ToolMessage, HumanMessage
 
 def filter_messages(messages):
     """
@@ -39,7 +43,18 @@ def filter_messages(messages):
             
     return filtered
 
-def create_analyst_node(llm, system_message, tools, output_field):
+def with_prefetched_data(messages, state, context):
+    """Insert the prefetched tool results ahead of the analyst's in-progress tool chain (if any)"""
+    note = HumanMessage(content=(
+        f"Data already retrieved for {state['company_of_interest']} as of {state['trade_date']}:\n\n{context}\n\n"
+        "Use this data for your report. Only call tools if you need additional lookups."
+    ))
+    for i, m in enumerate(messages):
+        if isinstance(m, AIMessage) and m.tool_calls:
+            return messages[:i] + [note] + messages[i:]
+    return messages + [note]
+
+def create_analyst_node(llm, system_message, tools, output_field, prefetch_key=None):
     prompt = ChatPromptTemplate.from_messages([
         ("system", system_message),
         MessagesPlaceholder(variable_name="messages"),
@@ -53,9 +68,41 @@ def create_analyst_node(llm, system_message, tools, output_field):
         
         # Filter messages to reduce context size
         filtered_messages = filter_messages(messages)
+
+        budget = get_current_budget()
+
+        # Hand the analyst its prefetched tool results so it can report without a tool round trip
+        context = None
+        if prefetch_key:
+            wait = None
+            if budget:
+                wait = max(min(config.PREFETCH_TIMEOUT_SECONDS, budget.remaining() - config.DEADLINE_FINAL_RESERVE_SECONDS), 0)
+            context = get_prefetched(state["company_of_interest"], state["trade_date"], prefetch_key, timeout=wait)
+            if context:
+                filtered_messages = with_prefetched_data(filtered_messages, state, context)
+
+        # In incremental runs, reuse the report if the analyst sees exactly the same messages (prefetched
+        # data and earlier analysts' reports) as before. Only reports written in one step qualify:
+        # data from the analyst's own tool calls isn't part of the fingerprint.
+        memo_inputs = None
+        if context and not any(isinstance(m, ToolMessage) for m in filtered_messages):
+            memo_inputs = {"messages": [[m.type, m.content] for m in filtered_messages]}
+            cached_report = memo.lookup(output_field, memo_inputs)
+            if cached_report is not None:
+                return {"messages": [AIMessage(content=cached_report)], output_field: cached_report, "sender": "Analyst"}
         
         chain = prompt | llm_with_tools
-        result = chain.invoke({"messages": filtered_messages})
+        if budget and budget.level() != "normal":
+            # Running out of time: write the report from what we already have
+            chain = prompt | llm
+            budget.degrade(f"{output_field}: optional tool calls skipped")
+        try:
+            result = invoke_within_budget(chain, {"messages": filtered_messages}, config.DEADLINE_FINAL_RESERVE_SECONDS)
+        except DeadlineExceeded as e:
+            budget.degrade(f"{output_field}: analyst skipped ({e})")
+            report = f"Analysis skipped to meet the run deadline. Raw data:\n\n{context}" if context else \
+                "Analysis skipped to meet the run deadline; no data available."
+            return {"messages": [AIMessage(content=report)], output_field: report, "sender": "Analyst"}
         
         print(f"DEBUG: Analyst Node Result Type: {type(result)}")
         # print(f"DEBUG: Analyst Node Result: {result}") # Reduce log noise
@@ -75,6 +122,8 @@ def create_analyst_node(llm, system_message, tools, output_field):
         if not result.tool_calls:
             # If no tool calls, we assume the analyst has finished and provided the report.
             # We return the content as the report.
+            if memo_inputs and memo.incremental_enabled() and (budget is None or budget.level() == "normal"):
+                memo.store(output_field, memo_inputs, result.content)
             return {
                 "messages": [result],
                 output_field: result.content,
@@ -86,24 +135,27 @@ def create_analyst_node(llm, system_message, tools, output_field):
     return analyst_node
 
 # Define System Messages
-market_analyst_system_message = "You are a trading assistant specialized in analyzing financial markets. Your role is to select the most relevant technical indicators to analyze a stock's price action, momentum, and volatility. You must use your tools to get historical data and then generate a report with your findings, including a summary table."
-social_analyst_system_message = "You are a social media analyst. Your job is to analyze social media posts and public sentiment for a specific company over the past week. Use your tools to find relevant discussions and write a comprehensive report detailing your analysis, insights, and implications for traders, including a summary table."
-news_analyst_system_message = "You are a news researcher analyzing recent news and trends over the past week. Write a comprehensive report on the current state of the world relevant for trading and macroeconomics. Use your tools to be comprehensive and provide detailed analysis, including a summary table."
-fundamentals_analyst_system_message = "You are a researcher analyzing fundamental information about a company. Write a comprehensive report on the company's financials, insider sentiment, and transactions to gain a full view of its fundamental health, including a summary table."
+# The prefetched data is added to the conversation before the analyst's first turn; tools are a fallback
+_DATA_NOTE = " The data for your report is already provided in the conversation; only use your tools for additional lookups, or if that data is missing."
+
+market_analyst_system_message = "You are a trading assistant specialized in analyzing financial markets. Your role is to select the most relevant technical indicators to analyze a stock's price action, momentum, and volatility, and generate a report with your findings, including a summary table." + _DATA_NOTE
+social_analyst_system_message = "You are a social media analyst. Your job is to analyze social media posts and public sentiment for a specific company over the past week. Write a comprehensive report detailing your analysis, insights, and implications for traders, including a summary table." + _DATA_NOTE
+news_analyst_system_message = "You are a news researcher analyzing recent news and trends over the past week. Write a comprehensive report on the current state of the world relevant for trading and macroeconomics, with detailed analysis and a summary table." + _DATA_NOTE
+fundamentals_analyst_system_message = "You are a researcher analyzing fundamental information about a company. Write a comprehensive report on the company's financials, insider sentiment, and transactions to gain a full view of its fundamental health, including a summary table." + _DATA_NOTE
 
 # Factory functions to create nodes on demand
 def get_market_analyst_node():
     llm = get_llm()
-    return create_analyst_node(llm, market_analyst_system_message, [toolkit.get_yfinance_data, toolkit.get_technical_indicators], "market_report")
+    return create_analyst_node(llm, market_analyst_system_message, [toolkit.get_yfinance_data, toolkit.get_technical_indicators], "market_report", "market")
 
 def get_social_analyst_node():
     llm = get_llm()
-    return create_analyst_node(llm, social_analyst_system_message, [toolkit.get_social_media_sentiment], "sentiment_report")
+    return create_analyst_node(llm, social_analyst_system_message, [toolkit.get_social_media_sentiment], "sentiment_report", "social")
 
 def get_news_analyst_node():
     llm = get_llm()
-    return create_analyst_node(llm, news_analyst_system_message, [toolkit.get_finnhub_news, toolkit.get_macroeconomic_news], "news_report")
+    return create_analyst_node(llm, news_analyst_system_message, [toolkit.get_finnhub_news, toolkit.get_macroeconomic_news], "news_report", "news")
 
 def get_fundamentals_analyst_node():
     llm = get_llm()
-    return create_analyst_node(llm, fundamentals_analyst_system_message, [toolkit.get_fundamental_analysis], "fundamentals_report")
+    return create_analyst_node(llm, fundamentals_analyst_system_message, [toolkit.get_fundamental_analysis], "fundamentals_report", "fundamentals")
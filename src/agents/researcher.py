@@ -1,9 +1,16 @@
 from src.state import AgentState
 from src.memory import FinancialSituationMemory
 from src.llm_utils import get_llm
+from src.config import config
+from src.debate_control import STANCE_INSTRUCTION, get_invest_debate_controller
+from src.budget import get_current_budget, budget_level, call_within_budget, invoke_within_budget, DeadlineExceeded
 
-def create_researcher_node(llm, memory, role_prompt, agent_name):
+def create_researcher_node(llm, memory, role_prompt, agent_name, controller=None):
     def researcher_node(state: AgentState):
+        if state['investment_debate_state'].get('stop_reason', '').startswith('deadline'):
+            # The other side already ran out of time this round
+            return {"investment_debate_state": state['investment_debate_state']}
+
         # Combine all reports and debate history for context.
         # Truncate reports to avoid hitting token limits
         market_report = state['market_report'][:2000] + "..." if len(state['market_report']) > 2000 else state['market_report']
@@ -17,7 +24,13 @@ def create_researcher_node(llm, memory, role_prompt, agent_name):
         News Report: {news_report}
         Fundamentals Report: {fundamentals_report}
         """
-        past_memories = memory.get_memories(situation_summary)
+        try:
+            # The embedding lookup is a network call too; don't let it eat the judges' reserve
+            past_memories = call_within_budget(memory.get_memories, situation_summary,
+                                               reserve=config.DEADLINE_FINAL_RESERVE_SECONDS)
+        except DeadlineExceeded as e:
+            get_current_budget().degrade(f"past memories skipped ({e})")
+            past_memories = []
         past_memory_str = "\n".join([mem['recommendation'] for mem in past_memories])
         
         prompt = f"""{role_prompt}
@@ -26,9 +39,16 @@ def create_researcher_node(llm, memory, role_prompt, agent_name):
         Conversation history: {state['investment_debate_state']['history']}
         Your opponent's last argument: {state['investment_debate_state']['current_response']}
         Reflections from similar past situations: {past_memory_str or 'No past memories found.'}
-        Based on all this information, present your argument conversationally."""
+        Based on all this information, present your argument conversationally.
+        {STANCE_INSTRUCTION}"""
         
-        response = llm.invoke(prompt)
+        try:
+            response = invoke_within_budget(llm, prompt, config.DEADLINE_FINAL_RESERVE_SECONDS)
+        except DeadlineExceeded as e:
+            get_current_budget().degrade("investment debate cut short")
+            debate_state = state['investment_debate_state'].copy()
+            debate_state['stop_reason'] = f"deadline: {e}"
+            return {"investment_debate_state": debate_state}
         argument = f"{agent_name}: {response.content}"
         
         # Update the debate state
@@ -40,18 +60,30 @@ def create_researcher_node(llm, memory, role_prompt, agent_name):
             debate_state['bear_history'] += "\n" + argument
         debate_state['current_response'] = argument
         debate_state['count'] += 1
+        if controller:
+            debate_state['stop_reason'] = controller.assess(debate_state['history'], debate_state['count'])
         return {"investment_debate_state": debate_state}
 
     return researcher_node
 
-def create_research_manager(llm, memory):
+def create_research_manager(llm, memory, quick_llm=None):
     def research_manager_node(state: AgentState):
         prompt = f"""As the Research Manager, your role is to critically evaluate the debate between the Bull and Bear analysts and make a definitive decision.
         Summarize the key points, then provide a clear recommendation: Buy, Sell, or Hold. Develop a detailed investment plan for the trader, including your rationale and strategic actions.
         
         Debate History:
         {state['investment_debate_state']['history']}"""
-        response = llm.invoke(prompt)
+
+        model = llm
+        if quick_llm and budget_level() != "normal":
+            model = quick_llm
+            get_current_budget().degrade("Research Manager used the fast model")
+        try:
+            response = invoke_within_budget(model, prompt, config.DEADLINE_JUDGE_RESERVE_SECONDS)
+        except DeadlineExceeded as e:
+            get_current_budget().degrade(f"Research Manager skipped ({e})")
+            return {"investment_plan": "No investment plan: research review skipped to meet the run deadline.\n"
+                                       f"Latest debate arguments:{state['investment_debate_state']['history'][-3000:]}"}
         return {"investment_plan": response.content}
     return research_manager_node
 
@@ -66,13 +98,14 @@ bear_prompt = "You are a Bear Analyst. Your goal is to argue against investing i
 # Factory functions
 def get_bull_researcher_node():
     llm = get_llm(model_name="gpt-4o-mini")
-    return create_researcher_node(llm, bull_memory, bull_prompt, "Bull Analyst")
+    return create_researcher_node(llm, bull_memory, bull_prompt, "Bull Analyst", get_invest_debate_controller())
 
 def get_bear_researcher_node():
     llm = get_llm(model_name="gpt-4o-mini")
-    return create_researcher_node(llm, bear_memory, bear_prompt, "Bear Analyst")
+    return create_researcher_node(llm, bear_memory, bear_prompt, "Bear Analyst", get_invest_debate_controller())
 
 def get_research_manager_node():
-    deep_llm = get_llm(model_name="gpt-4o")
-    return create_research_manager(deep_llm, invest_judge_memory)
+    deep_llm = get_llm(model_name="gpt-4o", hedge_after=config.LLM_HEDGE_AFTER_SECONDS)
+    quick_llm = get_llm(model_name="gpt-4o-mini", hedge_after=config.LLM_HEDGE_AFTER_SECONDS)
+    return create_research_manager(deep_llm, invest_judge_memory, quick_llm)
 
@@ -1,11 +1,18 @@
 from src.state import AgentState
 from src.memory import FinancialSituationMemory
 from src.llm_utils import get_llm
+from src.config import config
+from src.debate_control import STANCE_INSTRUCTION, get_risk_debate_controller
+from src.budget import get_current_budget, budget_level, invoke_within_budget, DeadlineExceeded
+from src.run_store import extract_decision
 
-def create_risk_debator(llm, role_prompt, agent_name):
+def create_risk_debator(llm, role_prompt, agent_name, controller=None):
     def risk_debator_node(state: AgentState):
         # Get the arguments from the other two debaters.
         risk_state = state['risk_debate_state']
+        if risk_state.get('stop_reason', '').startswith('deadline'):
+            # An earlier speaker this round already ran out of time
+            return {"risk_debate_state": risk_state}
         opponents_args = []
         if agent_name != 'Risky Analyst' and risk_state['current_risky_response']: opponents_args.append(f"Risky: {risk_state['current_risky_response']}")
         if agent_name != 'Safe Analyst' and risk_state['current_safe_response']: opponents_args.append(f"Safe: {risk_state['current_safe_response']}")
@@ -19,9 +26,16 @@ def create_risk_debator(llm, role_prompt, agent_name):
         Here is the trader's plan: {trader_plan}
         Debate history: ...{debate_history}
         Your opponents' last arguments:\n{'\n'.join(opponents_args)}
-        Critique or support the plan from your perspective."""
+        Critique or support the plan from your perspective.
+        {STANCE_INSTRUCTION}"""
         
-        response = llm.invoke(prompt).content
+        try:
+            response = invoke_within_budget(llm, prompt, config.DEADLINE_JUDGE_RESERVE_SECONDS).content
+        except DeadlineExceeded as e:
+            get_current_budget().degrade("risk debate cut short")
+            new_risk_state = risk_state.copy()
+            new_risk_state['stop_reason'] = f"deadline: {e}"
+            return {"risk_debate_state": new_risk_state}
         
         # Update state
         new_risk_state = risk_state.copy()
@@ -31,11 +45,21 @@ def create_risk_debator(llm, role_prompt, agent_name):
         elif agent_name == 'Safe Analyst': new_risk_state['current_safe_response'] = response
         else: new_risk_state['current_neutral_response'] = response
         new_risk_state['count'] += 1
+        if controller:
+            new_risk_state['stop_reason'] = controller.assess(new_risk_state['history'], new_risk_state['count'])
         return {"risk_debate_state": new_risk_state}
 
     return risk_debator_node
 
-def create_risk_manager(llm, memory):
+def deadline_fallback_decision(trader_plan: str, reason: str) -> str:
+    """Final decision without an LLM call: adopt the trader's proposal (HOLD if there is none)"""
+    decision = extract_decision(trader_plan)
+    if decision == "UNKNOWN":
+        decision = "HOLD"
+    return (f"Justification: risk review skipped to meet the run deadline ({reason}); "
+            f"adopting the trader's proposal without risk-committee changes.\n\nFINAL DECISION: **{decision}**")
+
+def create_risk_manager(llm, memory, quick_llm=None):
     def risk_manager_node(state: AgentState):
         # Truncate inputs
         trader_plan = state['trader_investment_plan'][:5000] + "..." if len(state['trader_investment_plan']) > 5000 else state['trader_investment_plan']
@@ -43,10 +67,19 @@ def create_risk_manager(llm, memory):
 
         prompt = f"""As the Portfolio Manager, your decision is final. Review the trader's plan and the risk debate.
         Provide a final, binding decision: Buy, Sell, or Hold, and a brief justification.
+        Your response must end with 'FINAL DECISION: **BUY/HOLD/SELL**'.
         
         Trader's Plan: {trader_plan}
         Risk Debate: ...{debate_history}"""
-        response = llm.invoke(prompt).content
+        model = llm
+        if quick_llm and budget_level() != "normal":
+            model = quick_llm
+            get_current_budget().degrade("Risk Judge used the fast model")
+        try:
+            response = invoke_within_budget(model, prompt, config.DEADLINE_DECISION_MARGIN_SECONDS).content
+        except DeadlineExceeded as e:
+            get_current_budget().degrade(f"Risk Judge fell back to the trader's proposal ({e})")
+            response = deadline_fallback_decision(state['trader_investment_plan'], str(e))
         return {"final_trade_decision": response}
     return risk_manager_node
 
@@ -58,16 +91,17 @@ neutral_prompt = "You are the Neutral Risk Analyst. You provide a balanced persp
 
 def get_risky_node():
     llm = get_llm(model_name="gpt-4o-mini")
-    return create_risk_debator(llm, risky_prompt, "Risky Analyst")
+    return create_risk_debator(llm, risky_prompt, "Risky Analyst", get_risk_debate_controller())
 
 def get_safe_node():
     llm = get_llm(model_name="gpt-4o-mini")
-    return create_risk_debator(llm, safe_prompt, "Safe Analyst")
+    return create_risk_debator(llm, safe_prompt, "Safe Analyst", get_risk_debate_controller())
 
 def get_neutral_node():
     llm = get_llm(model_name="gpt-4o-mini")
-    return create_risk_debator(llm, neutral_prompt, "Neutral Analyst")
+    return create_risk_debator(llm, neutral_prompt, "Neutral Analyst", get_risk_debate_controller())
 
 def get_risk_manager_node():
-    deep_llm = get_llm(model_name="gpt-4o")
-    return create_risk_manager(deep_llm, risk_manager_memory)
+    deep_llm = get_llm(model_name="gpt-4o", hedge_after=config.LLM_HEDGE_AFTER_SECONDS)
+    quick_llm = get_llm(model_name="gpt-4o-mini", hedge_after=config.LLM_HEDGE_AFTER_SECONDS)
+    return create_risk_manager(deep_llm, risk_manager_memory, quick_llm)
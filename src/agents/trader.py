@@ -1,6 +1,9 @@
 from src.state import AgentState
 from src.memory import FinancialSituationMemory
 from src.llm_utils import get_llm
+from src.config import config
+from src.budget import get_current_budget, invoke_within_budget, DeadlineExceeded
+from src.run_store import extract_decision
 import functools
 
 def create_trader(llm, memory):
@@ -9,7 +12,14 @@ def create_trader(llm, memory):
         Your response must end with 'FINAL TRANSACTION PROPOSAL: **BUY/HOLD/SELL**'.
         
         Proposed Investment Plan: {state['investment_plan']}"""
-        result = llm.invoke(prompt)
+        try:
+            result = invoke_within_budget(llm, prompt, config.DEADLINE_JUDGE_RESERVE_SECONDS)
+        except DeadlineExceeded as e:
+            get_current_budget().degrade(f"Trader skipped ({e})")
+            decision = extract_decision(state['investment_plan'])
+            plan = (f"{state['investment_plan']}\n\n(Trader step skipped to meet the run deadline.)\n"
+                    f"FINAL TRANSACTION PROPOSAL: **{decision if decision != 'UNKNOWN' else 'HOLD'}**")
+            return {"trader_investment_plan": plan, "sender": name}
         return {"trader_investment_plan": result.content, "sender": name}
     return trader_node
 
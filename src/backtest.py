@@ -0,0 +1,167 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.config import config
+from src.graph import run_pipeline
+from src.llm_utils import get_model_label
+from src.run_store import extract_decision, run_store
+from src.tools.market_data import load_price_history
+
+# Position taken for each decision when scoring against forward returns
+POSITION = {"BUY": 1, "SELL": -1, "HOLD": 0}
+
+def _shift_date(date_str: str, days: int) -> str:
+    return (datetime.date.fromisoformat(date_str) + datetime.timedelta(days=days)).isoformat()
+
+def trading_days(ticker: str, start_date: str, end_date: str) -> List[str]:
+    """Dates in [start_date, end_date] on which `ticker` has a daily bar"""
+    history = load_price_history(ticker, start_date, _shift_date(end_date, 1))
+    return [d.strftime("%Y-%m-%d") for d in history.index]
+
+def forward_returns(ticker: str, trade_date: str, horizons: List[int]) -> Dict[str, Optional[float]]:
+    """Close-to-close returns from `trade_date` to `h` trading days later (None if not yet known)"""
+    # ~1.5 calendar days per trading day plus slack for holidays
+    end_date = _shift_date(trade_date, int(max(horizons) * 1.5) + 10)
+    closes = load_price_history(ticker, trade_date, end_date)["Close"]
+    returns = {}
+    for h in horizons:
+        if len(closes) > h and closes.index[0].strftime("%Y-%m-%d") == trade_date:
+            returns[str(h)] = float(closes.iloc[h] / closes.iloc[0] - 1)
+        else:
+            returns[str(h)] = None
+    return returns
+
+class Backtest:
+    """
+    Replays the agent pipeline over a (ticker x trading day) grid with point-in-time data
+    and scores each final_trade_decision against forward returns.
+
+    Every finished (ticker, date) is appended to RESULTS_DIR/backtests/<name>.jsonl, so an
+    interrupted backtest resumes where it stopped. Runs execute concurrently; LLM calls still
+    go through the shared rate limiter in llm_utils.
+    """
+
+    def __init__(self, name: str, tickers: List[str], start_date: str, end_date: str,
+                 horizons: Optional[List[int]] = None, max_workers: Optional[int] = None):
+        self.name = name
+        self.tickers = [t.upper() for t in tickers]
+        self.start_date = start_date
+        self.end_date = end_date
+        self.horizons = horizons or config.BACKTEST_HORIZONS
+        self.max_workers = max_workers or config.BACKTEST_MAX_WORKERS
+        directory = os.path.join(config.RESULTS_DIR, "backtests")
+        os.makedirs(directory, exist_ok=True)
+        self.progress_path = os.path.join(directory, f"{name}.jsonl")
+        self._write_lock = threading.Lock()
+
+    def load_results(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.progress_path):
+            return []
+        results = []
+        with open(self.progress_path) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+        return results
+
+    def _record(self, result: Dict[str, Any]):
+        with self._write_lock:
+            with open(self.progress_path, "a") as f:
+                f.write(json.dumps(result) + "\n")
+
+    def grid(self) -> List[tuple]:
+        return [(ticker, date) for ticker in self.tickers
+                for date in trading_days(ticker, self.start_date, self.end_date)]
+
+    def run_one(self, ticker: str, trade_date: str) -> Dict[str, Any]:
+        started = time.time()
+        state = run_pipeline(ticker, trade_date)
+        duration = time.time() - started
+        run_id = run_store.save_run(state, model=get_model_label(), duration_seconds=duration,
+                                    extra={"backtest": self.name})
+        return {
+            "ticker": ticker,
+            "trade_date": trade_date,
+            "decision": extract_decision(state.get("final_trade_decision", "")),
+            "run_id": run_id,
+            "duration_seconds": duration,
+            "forward_returns": forward_returns(ticker, trade_date, self.horizons),
+        }
+
+    def run(self) -> Dict[str, Any]:
+        done = {(r["ticker"], r["trade_date"]) for r in self.load_results()}
+        pending = [key for key in self.grid() if key not in done]
+        print(f"Backtest '{self.name}': {len(done)} done, {len(pending)} pending")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_one, *key): key for key in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                ticker, trade_date = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    # Not recorded, so the next run of this backtest retries it
+                    print(f"Backtest run failed for {ticker} {trade_date}:")
+                    traceback.print_exc()
+                    continue
+                self._record(result)
+                print(f"[{i}/{len(pending)}] {ticker} {trade_date}: {result['decision']}")
+
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        results = self.load_results()
+        if not results:
+            return {"runs": 0}
+
+        # Fill in forward returns that were still in the future when the run was recorded
+        for r in results:
+            if any(v is None for v in r["forward_returns"].values()):
+                r["forward_returns"] = forward_returns(r["ticker"], r["trade_date"], self.horizons)
+
+        df = pd.DataFrame(results)
+        position = df["decision"].map(POSITION).fillna(0)
+        summary = {"runs": len(df), "decisions": df["decision"].value_counts().to_dict(), "horizons": {}}
+        for h in self.horizons:
+            fwd = df["forward_returns"].map(lambda r: r.get(str(h))).astype(float)
+            known = fwd.notna()
+            strategy = (position * fwd)[known]
+            directional = known & (position != 0)
+            hits = (position[directional] * fwd[directional]) > 0
+            summary["horizons"][str(h)] = {
+                "scored_runs": int(known.sum()),
+                "mean_strategy_return": float(strategy.mean()) if len(strategy) else None,
+                "total_strategy_return": float(strategy.sum()) if len(strategy) else None,
+                "hit_rate": float(hits.mean()) if len(hits) else None,
+            }
+        return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the trading agents over a date range")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--start", required=True, help="yyyy-mm-dd")
+    parser.add_argument("--end", required=True, help="yyyy-mm-dd")
+    parser.add_argument("--name", help="Backtest name (reuse it to resume)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    name = args.name or f"{'-'.join(args.tickers)}_{args.start}_{args.end}"
+    summary = Backtest(name, args.tickers, args.start, args.end, max_workers=args.workers).run()
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from src.config import config
+from src.events import publish_event
+
+_current_budget: contextvars.ContextVar = contextvars.ContextVar("run_budget", default=None)
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="budgeted-call")
+
+class DeadlineExceeded(Exception):
+    pass
+
+class RunBudget:
+    """
+    Wall-clock budget for one run.
+
+    level() is "normal", "low" (less than DEADLINE_LOW_FRACTION of the budget left: debates
+    are cut short, judges use the fast model, analysts skip optional tool calls) or "critical"
+    (only the final reserve is left: everything before the judges is skipped). Degradations
+    and per-node timings are collected for the run's output.
+    """
+
+    def __init__(self, deadline_seconds: float):
+        self.total = deadline_seconds
+        self.started = time.time()
+        self.deadline = self.started + deadline_seconds
+        self.degradations: List[str] = []
+        self.node_timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.time() - self.started
+
+    def remaining(self) -> float:
+        return self.deadline - time.time()
+
+    def level(self) -> str:
+        remaining = self.remaining()
+        if remaining <= config.DEADLINE_FINAL_RESERVE_SECONDS:
+            return "critical"
+        if remaining <= self.total * config.DEADLINE_LOW_FRACTION:
+            return "low"
+        return "normal"
+
+    def degrade(self, description: str):
+        with self._lock:
+            if description in self.degradations:
+                return
+            self.degradations.append(description)
+        print(f"Deadline: {description} ({self.remaining():.0f}s left)")
+        publish_event("degradation", description=description, remaining_seconds=round(self.remaining(), 1))
+
+    def record_node(self, name: str, seconds: float):
+        with self._lock:
+            self.node_timings[name] = self.node_timings.get(name, 0.0) + seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "deadline_seconds": self.total,
+            "elapsed_seconds": round(self.elapsed(), 1),
+            "degradations": list(self.degradations),
+            "node_timings": {k: round(v, 1) for k, v in self.node_timings.items()},
+        }
+
+def get_current_budget() -> Optional[RunBudget]:
+    return _current_budget.get()
+
+def budget_level() -> str:
+    budget = _current_budget.get()
+    return budget.level() if budget else "normal"
+
+@contextmanager
+def bind_budget(budget: Optional[RunBudget]):
+    """Make `budget` the current run's budget for code executed inside the block"""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+def call_within_budget(fn, *args, reserve: float):
+    """
+    fn(*args), but give up (DeadlineExceeded) once only `reserve` seconds of the run's budget
+    would be left. Without a budget this is a plain call.
+    The abandoned call keeps running in the background; its result is discarded.
+    """
+    budget = _current_budget.get()
+    if budget is None:
+        return fn(*args)
+    timeout = budget.remaining() - reserve
+    if timeout <= 0:
+        raise DeadlineExceeded(f"{budget.remaining():.0f}s left, {reserve:.0f}s reserved")
+    ctx = contextvars.copy_context()
+    future = _executor.submit(ctx.run, fn, *args)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise DeadlineExceeded(f"call did not finish within {timeout:.0f}s")
+
+def invoke_within_budget(runnable, input, reserve: float):
+    """runnable.invoke(input) bounded by the run's budget, see call_within_budget"""
+    return call_within_budget(runnable.invoke, input, reserve=reserve)
+
+def track_node(name: str, node):
+    """Wrap a graph node so its wall time is recorded on the current budget"""
+    @functools.wraps(node)
+    def tracked(state):
+        started = time.time()
+        try:
+            return node(state)
+        finally:
+            budget = _current_budget.get()
+            if budget:
+                budget.record_node(name, time.time() - started)
+    return tracked
@@ -17,7 +17,74 @@ class Config:
         self.MAX_DEBATE_ROUNDS = 2
         self.MAX_RISK_DISCUSS_ROUNDS = 1
         self.MAX_RECUR_LIMIT = 100
-        
+        # Run deadlines (optional per /trade request): below LOW_FRACTION of the budget the run
+        # degrades; the reserves are kept back for the judges so a decision always gets made
+        self.DEFAULT_RUN_DEADLINE_SECONDS = None
+        self.DEADLINE_LOW_FRACTION = 0.35
+        self.DEADLINE_FINAL_RESERVE_SECONDS = 60  # Research Manager + Trader + Risk Judge
+        self.DEADLINE_JUDGE_RESERVE_SECONDS = 20  # Risk Judge
+        self.DEADLINE_DECISION_MARGIN_SECONDS = 2  # time to emit the fallback decision
+        # LLM routing: minimum seconds between requests per API key (10s = Gemini free tier, 6 RPM)
+        self.LLM_MIN_DELAY = {"gemini": 10.0, "openai": 0.0, "openrouter": 0.0}
+        self.LLM_DEFAULT_RPM = 500  # assumed per-key quota when a provider has no min delay
+        self.LLM_PROVIDER_WEIGHTS = {"openai": 1.0, "gemini": 1.0, "openrouter": 1.0}
+        self.LLM_MAX_ATTEMPTS = 4  # failover attempts per call across endpoints
+        self.LLM_AUTH_COOLDOWN_SECONDS = 600  # a key rejected with 401/403 is skipped this long
+        self.LLM_HEDGE_AFTER_SECONDS = 30.0  # duplicate slow judge calls onto a second endpoint
+        # Debates may end early (convergence/consensus) but never before the min rounds
+        self.MIN_DEBATE_ROUNDS = 1
+        self.MIN_RISK_DISCUSS_ROUNDS = 1
+        self.DEBATE_SIMILARITY_THRESHOLD = 0.8
+        self.STREAM_SNAPSHOT_INTERVAL = 20  # delta stream: full snapshot every N update events
+        self.PRICE_CACHE_TTL_SECONDS = 3600  # how long not-yet-final daily bars are reused
+        self.BACKTEST_MAX_WORKERS = 4
+        # Data source resilience (yfinance, finnhub, tavily)
+        self.TOOL_TIMEOUT_SECONDS = {"yfinance": 20, "yfinance_bulk": 120, "finnhub": 10, "tavily": 20}
+        self.TOOL_MAX_ATTEMPTS = 3
+        self.TOOL_BACKOFF_BASE_SECONDS = 1.0
+        self.TOOL_BACKOFF_MAX_SECONDS = 30.0  # a longer Retry-After fails over to the cache instead
+        self.BREAKER_FAILURE_THRESHOLD = 3
+        self.BREAKER_RESET_SECONDS = 60
+        self.TOOL_CACHE_FRESH_SECONDS = {"finnhub": 1800, "tavily": 1800}  # serve pre-warmed results this young without a call
+        # Tool calls started for every analyst as soon as a run begins
+        self.PREFETCH_MAX_WORKERS = 8
+        self.PREFETCH_TIMEOUT_SECONDS = 60
+        self.PREFETCH_PRICE_LOOKBACK_DAYS = 365  # enough history for the 200-day SMA
+        self.PREFETCH_NEWS_LOOKBACK_DAYS = 7
+        self.PREFETCH_REUSE_SECONDS = 300  # runs starting within this window share fetched data
+        self.BACKTEST_HORIZONS = [1, 5, 20]  # forward return horizons in trading days
+        # Job queue (POST /jobs) and worker processes (python -m src.worker). Single host: the API and
+        # workers share this SQLite database, which must be on a local disk (WAL locking breaks on NFS)
+        self.JOB_DB_PATH = os.path.join(self.RESULTS_DIR, "jobs.db")
+        self.JOB_POLL_INTERVAL_SECONDS = 0.5
+        self.JOB_LEASE_SECONDS = 120  # a running job without a heartbeat for this long is requeued
+        self.JOB_MAX_ATTEMPTS = 2
+        self.WORKER_PROCESSES = 2
+        # Identical (ticker, trade_date, config) requests reuse a stored run completed within this
+        # window (per-request max_age_seconds overrides; 0 disables)
+        self.RUN_RESULT_CACHE_SECONDS = 900
+        # Incremental runs: node outputs are cached under a fingerprint of the state fields (and,
+        # for analysts, the data) they read, so unchanged nodes are skipped on re-runs
+        self.INCREMENTAL_RUNS = False  # default for requests that don't say
+        self.NODE_MEMO_TTL_SECONDS = 24 * 3600  # older entries are ignored and pruned from disk
+        self.NODE_MEMO_MAX_ENTRIES = 1000  # kept in memory (least recently used dropped)
+        self.NODE_MEMO_PRUNE_INTERVAL_SECONDS = 3600
+        # Watchlist pre-warming: fetch every analyst's data into the local caches ahead of the runs.
+        # Times are local "HH:MM" on weekdays, ideally within TOOL_CACHE_FRESH_SECONDS of the open; the
+        # scheduler starts with the API when the watchlist is set
+        self.PREWARM_WATCHLIST = [t.strip().upper() for t in os.getenv("PREWARM_WATCHLIST", "").split(",") if t.strip()]
+        self.PREWARM_TIMES = ["09:15"]
+        self.PREWARM_MAX_WORKERS = 4
+        # Universe pre-screener: cheap vectorized factors pick the tickers worth a full run
+        self.SCREEN_TOP_K = 10
+        self.SCREEN_BATCH_SIZE = 200  # symbols per bulk yfinance download
+        self.SCREEN_LOOKBACK_DAYS = 200  # calendar days, covers the 126-day momentum window
+        self.SCREEN_MIN_BARS = 130
+        self.SCREEN_MIN_PRICE = 5.0
+        self.SCREEN_MIN_DOLLAR_VOLUME = 5_000_000  # 20-day average
+        self.SCREEN_FACTOR_WEIGHTS = {"momentum": 1.0, "volatility_breakout": 0.75, "price_breakout": 0.5,
+                                      "volume_spike": 1.0, "rsi_extreme": 0.75}
+
         # Create directories
         os.makedirs(self.RESULTS_DIR, exist_ok=True)
         os.makedirs(self.DATA_CACHE_DIR, exist_ok=True)
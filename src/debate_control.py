@@ -0,0 +1,101 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+
+from src.config import config
+from src.budget import get_current_budget
+
+_STOPWORDS = {
+    "the", "and", "for", "that", "this", "with", "are", "but", "not", "its", "was", "has", "have",
+    "will", "can", "our", "their", "from", "which", "while", "been", "also", "more", "than", "into",
+    "your", "you", "they", "them", "these", "those", "such", "there", "what", "would", "could",
+}
+
+# Debaters close every turn with this line; the stance is read from it, never from the argument
+# itself, which quotes and rebuts the other side's case
+STANCE_INSTRUCTION = "End your argument with a final line 'STANCE: **BUY/HOLD/SELL**' giving your own recommendation."
+_STANCE_LINE = re.compile(r"^\W*STANCE\W*:\W*(BUY|SELL|HOLD)\b", re.IGNORECASE | re.MULTILINE)
+
+def _term_vector(text: str) -> Counter:
+    words = re.findall(r"[a-z][a-z0-9']+", text.lower())
+    return Counter(w for w in words if len(w) > 2 and w not in _STOPWORDS)
+
+def text_similarity(a: str, b: str) -> float:
+    """Cosine similarity of term-frequency vectors (cheap, no API call)"""
+    va, vb = _term_vector(a), _term_vector(b)
+    if not va or not vb:
+        return 0.0
+    dot = sum(count * vb[term] for term, count in va.items())
+    norm = math.sqrt(sum(c * c for c in va.values())) * math.sqrt(sum(c * c for c in vb.values()))
+    return dot / norm
+
+def classify_stance(text: str) -> Optional[str]:
+    """BUY/SELL/HOLD from the turn's last 'STANCE: ...' line, or None if it has none"""
+    matches = _STANCE_LINE.findall(text)
+    return matches[-1].upper() if matches else None
+
+def split_turns(history: str, speaker: str) -> List[str]:
+    """Arguments made by `speaker` in a debate history built as '\\n<speaker>: <argument>' entries"""
+    marker = f"\n{speaker}: "
+    turns = []
+    for chunk in history.split(marker)[1:]:
+        # The chunk runs until the next speaker's entry
+        turns.append(re.split(r"\n(?:[A-Z][a-z]+ Analyst): ", chunk)[0])
+    return turns
+
+class DebateController:
+    """
+    Decides after each full round whether a debate should end.
+
+    A debate always runs at least `min_rounds` and at most `max_rounds` rounds. In between it
+    stops early when every debater repeats their previous argument (term-vector similarity above
+    `similarity_threshold`) or when all debaters have closed their last two turns with the same
+    stance (see STANCE_INSTRUCTION), and it always stops
+    once the run's deadline budget runs low. The returned reason is stored in the debate state
+    as `stop_reason`; an empty string means keep going.
+    """
+
+    def __init__(self, speakers: List[str], min_rounds: int, max_rounds: int,
+                 similarity_threshold: float = 0.8):
+        self.speakers = speakers
+        self.min_rounds = min(min_rounds, max_rounds)
+        self.max_rounds = max_rounds
+        self.similarity_threshold = similarity_threshold
+
+    def assess(self, history: str, count: int) -> str:
+        if count % len(self.speakers) != 0:
+            return ""  # mid-round
+        rounds = count // len(self.speakers)
+        if rounds >= self.max_rounds:
+            return f"max_rounds: reached {self.max_rounds} rounds"
+        budget = get_current_budget()
+        if budget and budget.level() != "normal":
+            budget.degrade(f"{' / '.join(self.speakers)} debate shortened")
+            return f"deadline: budget low after {rounds} rounds ({budget.remaining():.0f}s left)"
+        if rounds < self.min_rounds:
+            return ""
+
+        turns = {speaker: split_turns(history, speaker) for speaker in self.speakers}
+        if any(not t for t in turns.values()):
+            return ""
+
+        if all(len(t) >= 2 for t in turns.values()):
+            similarities = [text_similarity(t[-1], t[-2]) for t in turns.values()]
+            if min(similarities) >= self.similarity_threshold:
+                return f"converged: arguments repeating after {rounds} rounds (min similarity {min(similarities):.2f})"
+
+        # Consensus must hold for two consecutive rounds, not just be one round's coincidence
+        if len(self.speakers) > 1 and all(len(t) >= 2 for t in turns.values()):
+            stances = {classify_stance(turn) for t in turns.values() for turn in t[-2:]}
+            if len(stances) == 1 and None not in stances:
+                return f"consensus: all debaters recommend {stances.pop()} after {rounds} rounds"
+        return ""
+
+def get_invest_debate_controller() -> DebateController:
+    return DebateController(["Bull Analyst", "Bear Analyst"], config.MIN_DEBATE_ROUNDS,
+                            config.MAX_DEBATE_ROUNDS, config.DEBATE_SIMILARITY_THRESHOLD)
+
+def get_risk_debate_controller() -> DebateController:
+    return DebateController(["Risky Analyst", "Safe Analyst", "Neutral Analyst"], config.MIN_RISK_DISCUSS_ROUNDS,
+                            config.MAX_RISK_DISCUSS_ROUNDS, config.DEBATE_SIMILARITY_THRESHOLD)
@@ -0,0 +1,102 @@
+import contextvars
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# The bus of the run executing in the current context (propagated into worker threads via copy_context)
+_current_bus: contextvars.ContextVar = contextvars.ContextVar("run_event_bus", default=None)
+
+_CLOSED = object()
+
+class RunEventBus:
+    """
+    Per-run event channel between the graph (producer) and the HTTP stream (consumer).
+
+    The queue is bounded: essential events (node updates, completion) block the producer
+    until the consumer catches up, while droppable progress notices (rate limiting, tool calls)
+    are discarded when the queue is full rather than stalling the run.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._cancelled = threading.Event()
+        self.dropped = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def publish(self, event: Dict[str, Any], droppable: bool = False) -> bool:
+        """Queue an event. Returns False if it was dropped or the consumer went away."""
+        if self.cancelled:
+            return False
+        event.setdefault("timestamp", time.time())
+
+        if droppable:
+            try:
+                self._queue.put_nowait(event)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+        # Backpressure: wait for the consumer, but give up if it disconnects
+        while not self.cancelled:
+            try:
+                self._queue.put(event, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        """Signal the consumer that no more events will be published"""
+        while not self.cancelled:
+            try:
+                self._queue.put(_CLOSED, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def cancel(self):
+        """Called by the consumer when it stops reading (e.g. client disconnected)"""
+        self._cancelled.set()
+
+    def __iter__(self):
+        while True:
+            event = self._queue.get()
+            if event is _CLOSED:
+                return
+            yield event
+
+def get_current_bus() -> Optional[RunEventBus]:
+    return _current_bus.get()
+
+def publish_event(event_type: str, droppable: bool = True, **fields) -> bool:
+    """Publish an event to the current run's bus, if any. Safe to call from any layer."""
+    bus = _current_bus.get()
+    if bus is None:
+        return False
+    return bus.publish({"type": event_type, **fields}, droppable=droppable)
+
+@contextmanager
+def bind_bus(bus: Optional[RunEventBus]):
+    """Make `bus` the current run's bus for code executed inside the block"""
+    token = _current_bus.set(bus)
+    try:
+        yield bus
+    finally:
+        _current_bus.reset(token)
+
+def start_run_thread(bus: RunEventBus, target, *args, **kwargs) -> threading.Thread:
+    """Run `target` in a daemon thread with `bus` bound as the current bus"""
+    def runner():
+        with bind_bus(bus):
+            target(*args, **kwargs)
+
+    ctx = contextvars.copy_context()
+    thread = threading.Thread(target=ctx.run, args=(runner,), daemon=True)
+    thread.start()
+    return thread
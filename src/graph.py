@@ -1,9 +1,16 @@
+import threading
+import time
+import traceback
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_core.messages import HumanMessage, RemoveMessage
-from src.state import AgentState
+from langchain_core.messages import HumanMessage, RemoveMessage, ToolMessage
+from src.state import AgentState, create_initial_state
+from src.tools.market_data import point_in_time
 from src.config import config
 from src.tools.market_tools import toolkit
+from src.prefetch import start_prefetch
+from src.budget import DeadlineExceeded, RunBudget, bind_budget, get_current_budget, invoke_within_budget, track_node
+from src.memo import incremental_mode, memoize_node
 
 class ConditionalLogic:
     def __init__(self, max_debate_rounds=1, max_risk_discuss_rounds=1):
@@ -14,12 +21,14 @@ class ConditionalLogic:
         return "tools" if tools_condition(state) == "tools" else "continue"
 
     def should_continue_debate(self, state: AgentState) -> str:
-        if state["investment_debate_state"]["count"] >= 2 * self.max_debate_rounds:
+        debate_state = state["investment_debate_state"]
+        if debate_state.get("stop_reason") or debate_state["count"] >= 2 * self.max_debate_rounds:
             return "Research Manager"
         return "Bear Researcher" if state["investment_debate_state"]["current_response"].startswith("Bull") else "Bull Researcher"
 
     def should_continue_risk_analysis(self, state: AgentState) -> str:
-        if state["risk_debate_state"]["count"] >= 3 * self.max_risk_discuss_rounds:
+        risk_state = state["risk_debate_state"]
+        if risk_state.get("stop_reason") or risk_state["count"] >= 3 * self.max_risk_discuss_rounds:
             return "Risk Judge"
         speaker = state["risk_debate_state"]["latest_speaker"]
         if speaker == "Risky Analyst": return "Safe Analyst"
@@ -31,6 +40,30 @@ def create_msg_delete():
         return {"messages": [RemoveMessage(id=m.id) for m in state["messages"]] + [HumanMessage(content="Continue")]}
     return delete_messages
 
+def create_prefetch_node():
+    def prefetch(state):
+        # Kick off every analyst's standard tool calls in parallel; analysts pick up the results
+        start_prefetch(state["company_of_interest"], state["trade_date"])
+        return {"sender": "Prefetch"}
+    return prefetch
+
+def create_budgeted_tool_node(tools):
+    """
+    ToolNode that gives up once only the final reserve of the run's budget is left, answering
+    each pending tool call with a 'skipped' result so the analyst writes its report from what it has
+    """
+    tool_node = ToolNode(tools)
+
+    def run_tools(state):
+        try:
+            return invoke_within_budget(tool_node, state, config.DEADLINE_FINAL_RESERVE_SECONDS)
+        except DeadlineExceeded as e:
+            get_current_budget().degrade(f"tool calls skipped ({e})")
+            tool_calls = getattr(state["messages"][-1], "tool_calls", None) or []
+            return {"messages": [ToolMessage(content=f"Skipped to meet the run deadline ({e}); no data.",
+                                             tool_call_id=call["id"], name=call["name"]) for call in tool_calls]}
+    return run_tools
+
 def build_graph():
     """Build the graph lazily when needed"""
     # Import agent factory functions
@@ -60,18 +93,20 @@ def build_graph():
     msg_clear_node = create_msg_delete()
 
     # Create tool nodes
-    market_tool_node = ToolNode([toolkit.get_yfinance_data, toolkit.get_technical_indicators])
-    social_tool_node = ToolNode([toolkit.get_social_media_sentiment])
-    news_tool_node = ToolNode([toolkit.get_finnhub_news, toolkit.get_macroeconomic_news])
-    fundamentals_tool_node = ToolNode([toolkit.get_fundamental_analysis])
+    market_tool_node = create_budgeted_tool_node([toolkit.get_yfinance_data, toolkit.get_technical_indicators])
+    social_tool_node = create_budgeted_tool_node([toolkit.get_social_media_sentiment])
+    news_tool_node = create_budgeted_tool_node([toolkit.get_finnhub_news, toolkit.get_macroeconomic_news])
+    fundamentals_tool_node = create_budgeted_tool_node([toolkit.get_fundamental_analysis])
 
     workflow = StateGraph(AgentState)
 
+    workflow.add_node("Prefetch", track_node("Prefetch", create_prefetch_node()))
+
     # Add Analyst Nodes
-    workflow.add_node("Market Analyst", get_market_analyst_node())
-    workflow.add_node("Social Analyst", get_social_analyst_node())
-    workflow.add_node("News Analyst", get_news_analyst_node())
-    workflow.add_node("Fundamentals Analyst", get_fundamentals_analyst_node())
+    workflow.add_node("Market Analyst", track_node("Market Analyst", get_market_analyst_node()))
+    workflow.add_node("Social Analyst", track_node("Social Analyst", get_social_analyst_node()))
+    workflow.add_node("News Analyst", track_node("News Analyst", get_news_analyst_node()))
+    workflow.add_node("Fundamentals Analyst", track_node("Fundamentals Analyst", get_fundamentals_analyst_node()))
     workflow.add_node("Msg Clear", msg_clear_node)
 
     # Add tool nodes
@@ -81,19 +116,20 @@ def build_graph():
     workflow.add_node("fundamentals_tools", fundamentals_tool_node)
 
     # Add Researcher Nodes
-    workflow.add_node("Bull Researcher", get_bull_researcher_node())
-    workflow.add_node("Bear Researcher", get_bear_researcher_node())
-    workflow.add_node("Research Manager", get_research_manager_node())
+    workflow.add_node("Bull Researcher", track_node("Bull Researcher", memoize_node("Bull Researcher", get_bull_researcher_node())))
+    workflow.add_node("Bear Researcher", track_node("Bear Researcher", memoize_node("Bear Researcher", get_bear_researcher_node())))
+    workflow.add_node("Research Manager", track_node("Research Manager", memoize_node("Research Manager", get_research_manager_node())))
 
     # Add Trader and Risk Nodes
-    workflow.add_node("Trader", get_trader_node())
-    workflow.add_node("Risky Analyst", get_risky_node())
-    workflow.add_node("Safe Analyst", get_safe_node())
-    workflow.add_node("Neutral Analyst", get_neutral_node())
-    workflow.add_node("Risk Judge", get_risk_manager_node())
+    workflow.add_node("Trader", track_node("Trader", memoize_node("Trader", get_trader_node())))
+    workflow.add_node("Risky Analyst", track_node("Risky Analyst", memoize_node("Risky Analyst", get_risky_node())))
+    workflow.add_node("Safe Analyst", track_node("Safe Analyst", memoize_node("Safe Analyst", get_safe_node())))
+    workflow.add_node("Neutral Analyst", track_node("Neutral Analyst", memoize_node("Neutral Analyst", get_neutral_node())))
+    workflow.add_node("Risk Judge", track_node("Risk Judge", memoize_node("Risk Judge", get_risk_manager_node())))
 
     # Define Entry Point
-    workflow.set_entry_point("Market Analyst")
+    workflow.set_entry_point("Prefetch")
+    workflow.add_edge("Prefetch", "Market Analyst")
 
     # Analyst edges
     workflow.add_conditional_edges("Market Analyst", conditional_logic.should_continue_analyst, {"tools": "market_tools", "continue": "Social Analyst"})
@@ -131,10 +167,61 @@ def build_graph():
 
 # Don't build the graph at import time
 graph = None
+_graph_lock = threading.Lock()
 
 def get_graph():
     """Get or build the graph"""
     global graph
-    if graph is None:
-        graph = build_graph()
+    with _graph_lock:
+        if graph is None:
+            graph = build_graph()
     return graph
+
+def run_pipeline(ticker: str, trade_date: str, incremental=None) -> dict:
+    """Run the full graph for one ticker with point-in-time data and return the final state"""
+    incremental = config.INCREMENTAL_RUNS if incremental is None else incremental
+    with point_in_time(trade_date), incremental_mode(incremental):
+        return get_graph().invoke(create_initial_state(ticker, trade_date),
+                                  {"recursion_limit": config.MAX_RECUR_LIMIT})
+
+def stream_pipeline(bus, ticker: str, trade_date: str, deadline_seconds=None, config_key=None, incremental=None):
+    """
+    Run the full graph for one ticker, publishing every node update to `bus`, then persist
+    the run and publish a 'complete' event with its run_id (or an 'error' event).
+    Shared by the in-process /trade stream and the job workers. Incremental runs reuse the
+    outputs of nodes whose inputs haven't changed since an earlier run.
+    """
+    from src.llm_utils import get_model_label
+    from src.run_store import run_store
+    from src.singleflight import run_config_key
+
+    initial_state = create_initial_state(ticker, trade_date)
+    deadline = deadline_seconds or config.DEFAULT_RUN_DEADLINE_SECONDS
+    budget = RunBudget(deadline) if deadline else None
+    incremental = config.INCREMENTAL_RUNS if incremental is None else incremental
+    try:
+        started = time.time()
+        final_state = dict(initial_state)
+        # Tools only see market data up to the run's trade date
+        with point_in_time(trade_date), bind_budget(budget), incremental_mode(incremental):
+            for event in get_graph().stream(initial_state, {"recursion_limit": config.MAX_RECUR_LIMIT}):
+                # event is a dict like {'Node Name': {'updated_key': 'value'}}
+                for node_name, data in event.items():
+                    if isinstance(data, dict):
+                        final_state.update({k: v for k, v in data.items() if k != "messages"})
+                    bus.publish({"type": "update", "node": node_name, "data": data})
+
+        # Persist the finished run so it can be served without re-running the graph
+        budget_summary = budget.summary() if budget else None
+        extra = {"config_key": config_key or run_config_key(deadline_seconds)}
+        if budget:
+            extra["budget"] = budget_summary
+        run_id = run_store.save_run(final_state, model=get_model_label(),
+                                    duration_seconds=time.time() - started, extra=extra)
+        bus.publish({"type": "complete", "run_id": run_id, "budget": budget_summary})
+    except Exception as e:
+        print("Error running trade workflow:")
+        traceback.print_exc()
+        bus.publish({"type": "error", "error": str(e)})
+    finally:
+        bus.close()
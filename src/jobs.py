@@ -0,0 +1,239 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import config
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+TERMINAL_STATUSES = ("done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    run_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    return job
+
+class JobQueue:
+    """
+    Durable run queue in a SQLite database (WAL mode), shared by the API and any number of
+    worker processes on the same host. Keep the database on a local disk: WAL and SQLite's
+    file locks don't work across hosts or over NFS.
+
+    Workers claim the oldest queued job atomically and keep a heartbeat while running it.
+    A running job whose heartbeat is older than JOB_LEASE_SECONDS (worker crashed or was
+    killed) goes back to the queue, up to JOB_MAX_ATTEMPTS attempts. Every event the run
+    publishes is stored with a per-job sequence number, so clients can re-attach to a job's
+    stream from any offset.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.JOB_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, ticker: str, trade_date: str, params: Optional[Dict[str, Any]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO jobs (job_id, ticker, trade_date, params, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, ticker.upper(), trade_date, json.dumps(params or {}), time.time()))
+        return job_id
+
+    def submit_once(self, ticker: str, trade_date: str, params: Optional[Dict[str, Any]] = None):
+        """
+        Like submit, but if a queued or running job with the same ticker, date and params exists
+        return that one instead. Returns (job_id, created).
+        """
+        params = params or {}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT job_id, params FROM jobs WHERE ticker = ? AND trade_date = ? "
+                                "AND status IN ('queued', 'running') ORDER BY created_at",
+                                (ticker.upper(), trade_date)).fetchall()
+            for row in rows:
+                if json.loads(row["params"]) == params:
+                    conn.execute("COMMIT")
+                    return row["job_id"], False
+            job_id = self.submit(ticker, trade_date, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id, True
+
+    def add_completed(self, ticker: str, trade_date: str, params: Dict[str, Any], run_id: str,
+                      events: List[Dict[str, Any]]) -> str:
+        """Record a job answered from an already stored run, with the events to replay"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO jobs (job_id, ticker, trade_date, params, status, run_id, created_at, finished_at) "
+                         "VALUES (?, ?, ?, ?, 'done', ?, ?, ?)",
+                         (job_id, ticker.upper(), trade_date, json.dumps(params), run_id, now, now))
+            for event in events:
+                self._append(conn, job_id, event)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def find_running(self, ticker: str, trade_date: str, config_key: str) -> Optional[Dict[str, Any]]:
+        """The oldest running job for the same ticker, date and run configuration, if any"""
+        rows = self._conn().execute("SELECT * FROM jobs WHERE ticker = ? AND trade_date = ? "
+                                    "AND status = 'running' ORDER BY created_at",
+                                    (ticker.upper(), trade_date)).fetchall()
+        for row in rows:
+            job = _row_to_job(row)
+            if job["params"].get("config_key") == config_key:
+                return job
+        return None
+
+    def list_jobs(self, status: Optional[str] = None, ticker: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query, args = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            query += " AND status = ?"
+            args.append(status)
+        if ticker:
+            query += " AND ticker = ?"
+            args.append(ticker.upper())
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        return [_row_to_job(row) for row in self._conn().execute(query, args)]
+
+    def _requeue_expired(self, conn: sqlite3.Connection):
+        expired = conn.execute("SELECT job_id, attempts FROM jobs WHERE status = 'running' AND heartbeat_at < ?",
+                               (time.time() - config.JOB_LEASE_SECONDS,)).fetchall()
+        for row in expired:
+            if row["attempts"] >= config.JOB_MAX_ATTEMPTS:
+                conn.execute("UPDATE jobs SET status = 'failed', error = 'worker lost', finished_at = ? WHERE job_id = ?",
+                             (time.time(), row["job_id"]))
+                self._append(conn, row["job_id"], {"type": "error", "error": "worker lost"})
+            else:
+                conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE job_id = ?", (row["job_id"],))
+                self._append(conn, row["job_id"], {"type": "requeued", "reason": "worker lost"})
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job, or None if the queue is empty"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._requeue_expired(conn)
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                         "started_at = ?, heartbeat_at = ? WHERE job_id = ?", (worker, now, now, row["job_id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["job_id"])
+
+    def heartbeat(self, job_id: str):
+        self._conn().execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND status = 'running'",
+                             (time.time(), job_id))
+
+    def finish(self, job_id: str, run_id: str):
+        self._conn().execute("UPDATE jobs SET status = 'done', run_id = ?, finished_at = ? WHERE job_id = ?",
+                             (run_id, time.time(), job_id))
+
+    def fail(self, job_id: str, error: str):
+        self._conn().execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ?",
+                             (error, time.time(), job_id))
+
+    def _append(self, conn: sqlite3.Connection, job_id: str, event: Dict[str, Any]):
+        conn.execute("INSERT INTO job_events (job_id, seq, event) "
+                     "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM job_events WHERE job_id = ?",
+                     (job_id, json.dumps(event, default=str), job_id))
+
+    def append_event(self, job_id: str, event: Dict[str, Any]):
+        self._append(self._conn(), job_id, event)
+
+    def events(self, job_id: str, offset: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Stored events with seq > offset, oldest first, each with its 'seq'"""
+        rows = self._conn().execute("SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                                    (job_id, offset, limit))
+        return [{"seq": row["seq"], **json.loads(row["event"])} for row in rows]
+
+    def follow(self, job_id: str, offset: int = 0, poll_interval: Optional[float] = None,
+               stop_if_queued: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the job's events from `offset` on, live, until the job has finished (or, with
+        stop_if_queued, until it is back in the queue after its worker died)
+        """
+        poll_interval = poll_interval or config.JOB_POLL_INTERVAL_SECONDS
+        while True:
+            # Read the status before the events so nothing published in between is missed
+            job = self.get(job_id)
+            batch = self.events(job_id, offset)
+            for event in batch:
+                offset = event["seq"]
+                yield event
+            if batch:
+                continue
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return
+            if stop_if_queued and job["status"] == "queued":
+                return
+            time.sleep(poll_interval)
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Get or open the job queue (lazily, so importing this module has no side effects)"""
+    global job_queue
+    if job_queue is None:
+        job_queue = JobQueue()
+    return job_queue
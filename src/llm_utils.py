@@ -3,37 +3,193 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from src.config import config
 import os
 import time
+import random
 import threading
-from typing import Any, List, Optional
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Optional
 from langchain_core.messages import BaseMessage
 from langchain_core.language_models import BaseChatModel
 from langchain_core.outputs import ChatResult
 from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.runnables import RunnableBinding
+from src.events import publish_event
+from src.resilience import is_auth_error, is_retryable, retry_after
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
-# Global lock and timestamp for rate limiting
-_rate_limit_lock = threading.Lock()
-_last_request_time = 0
-_min_delay = 10.0  # 10 seconds between requests (6 requests/min to be safe)
 _request_count = 0
-_rate_limit_callback = None
+_count_lock = threading.Lock()
+
+# Pacing, quota and health are tracked per (provider, API key) and shared by every model used
+# with that key (e.g. gpt-4o-mini and gpt-4o, or Gemini, which uses GEMINI_MODEL for both)
+_key_states: Dict[tuple, "APIKeyState"] = {}
+# One endpoint per (provider, key, model)
+_endpoints: Dict[tuple, "LLMEndpoint"] = {}
+_endpoints_lock = threading.Lock()
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+class APIKeyState:
+    """Pacing, one-minute quota window and health of one (provider, API key)"""
+
+    def __init__(self, provider: str, key_hint: str):
+        self.label = f"{provider}:...{key_hint}"
+        self.min_delay = config.LLM_MIN_DELAY.get(provider, 0.0)
+        self.requests_per_minute = 60.0 / self.min_delay if self.min_delay else config.LLM_DEFAULT_RPM
+        self.cooldown_until = 0.0
+        self.failures = 0
+        self._lock = threading.Lock()  # held across the pacing sleep in acquire()
+        self._last_request_time = 0.0
+        self._recent = deque()
+        self._recent_lock = threading.Lock()
+
+    def remaining_quota(self) -> float:
+        """Requests still available in the current one-minute window (0 while cooling down)"""
+        now = time.time()
+        if self.cooldown_until > now:
+            return 0.0
+        with self._recent_lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            used = len(self._recent)
+        return max(self.requests_per_minute - used, 0.0)
+
+    def acquire(self):
+        """Block until this key may send the next request"""
+        global _request_count
+        with self._lock:
+            now = time.time()
+            sleep_time = max(self.cooldown_until - now, self.min_delay - (now - self._last_request_time), 0.0)
+            if sleep_time > 0:
+                print(f"⏱️  Rate limiting: Waiting {sleep_time:.1f}s on {self.label} (Request #{_request_count + 1})")
+                # Notify the current run's event stream (no-op outside a run)
+                publish_event(
+                    "rate_limit",
+                    message=f"⏱️ Rate limiting: Waiting {sleep_time:.1f}s (Request #{_request_count + 1})",
+                    sleep_time=sleep_time,
+                    request_number=_request_count + 1
+                )
+                time.sleep(sleep_time)
+            self._last_request_time = time.time()
+            with self._recent_lock:
+                self._recent.append(self._last_request_time)
+        with _count_lock:
+            _request_count += 1
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, error: Exception):
+        """Take the key out of rotation for Retry-After, or an exponential backoff (long for auth errors)"""
+        self.failures += 1
+        if is_auth_error(error):
+            print(f"Warning: {self.label} was rejected ({type(error).__name__}), "
+                  f"benched for {config.LLM_AUTH_COOLDOWN_SECONDS}s")
+            delay = config.LLM_AUTH_COOLDOWN_SECONDS
+        else:
+            delay = retry_after(error) or min(2 ** self.failures, 60)
+        self.cooldown_until = max(self.cooldown_until, time.time() + delay)
+
+class LLMEndpoint:
+    """One model on one (provider, API key); pacing and health live on the shared key state"""
+
+    def __init__(self, provider: str, llm: BaseChatModel, key_state: APIKeyState):
+        self.provider = provider
+        self.llm = llm
+        self.key_state = key_state
+        self.label = key_state.label
+        self.weight = config.LLM_PROVIDER_WEIGHTS.get(provider, 1.0)
+
+    @property
+    def cooldown_until(self) -> float:
+        return self.key_state.cooldown_until
+
+    def remaining_quota(self) -> float:
+        return self.key_state.remaining_quota()
+
+    def acquire(self):
+        self.key_state.acquire()
+
+    def record_success(self):
+        self.key_state.record_success()
 
-def set_rate_limit_callback(callback):
-    """Set a callback function to be called when rate limiting occurs"""
-    global _rate_limit_callback
-    _rate_limit_callback = callback
+    def record_failure(self, error: Exception):
+        self.key_state.record_failure(error)
 
 def get_rate_limit_stats():
     """Get current rate limiting statistics"""
     return {
         "total_requests": _request_count,
-        "min_delay_seconds": _min_delay,
-        "last_request_time": _last_request_time
+        "endpoints": [
+            {"endpoint": k.label, "min_delay_seconds": k.min_delay, "remaining_quota": k.remaining_quota(),
+             "cooldown_until": k.cooldown_until}
+            for k in list(_key_states.values())
+        ],
     }
 
-class RateLimitWrapper(BaseChatModel):
-    """Wrapper to enforce rate limits on LLM calls"""
-    llm: BaseChatModel
-    
+class LLMRouter(BaseChatModel):
+    """
+    Spreads calls over every configured endpoint (OpenAI, Gemini, OpenRouter; several keys each).
+
+    Endpoints are tried in a weighted random order favouring the most remaining quota.
+    A 429/5xx puts the endpoint in cooldown and the call fails over to the next one. With
+    `hedge_after` set, a duplicate request is sent to a second endpoint if the first has not
+    answered in time, and whichever finishes first wins.
+    """
+    endpoints: List[Any]
+    hedge_after: Optional[float] = None
+
+    def _ordered_endpoints(self) -> List[LLMEndpoint]:
+        now = time.time()
+        ready = [e for e in self.endpoints if e.cooldown_until <= now]
+        if not ready:
+            # Everything is cooling down: use the one that recovers first (acquire waits for it)
+            return [min(self.endpoints, key=lambda e: e.cooldown_until)]
+        # Weighted shuffle without replacement (Efraimidis-Spirakis keys)
+        keyed = [(random.random() ** (1.0 / max(e.remaining_quota() * e.weight, 0.01)), e) for e in ready]
+        return [e for _, e in sorted(keyed, key=lambda kv: kv[0], reverse=True)]
+
+    def _call(self, endpoint: LLMEndpoint, messages, stop, run_manager, tools, tool_kwargs, kwargs) -> ChatResult:
+        endpoint.acquire()
+        call_kwargs = dict(kwargs)
+        if tools:
+            # Each provider formats tools its own way
+            call_kwargs.update(endpoint.llm.bind_tools(tools, **tool_kwargs).kwargs)
+        try:
+            result = endpoint.llm._generate(messages, stop=stop, run_manager=run_manager, **call_kwargs)
+        except Exception as e:
+            if is_retryable(e) or is_auth_error(e):
+                endpoint.record_failure(e)
+            raise
+        endpoint.record_success()
+        return result
+
+    def _hedged(self, primary, backup, messages, stop, tools, tool_kwargs, kwargs) -> ChatResult:
+        def submit(endpoint):
+            ctx = contextvars.copy_context()
+            return _hedge_executor.submit(ctx.run, self._call, endpoint, messages, stop, None, tools, tool_kwargs, kwargs)
+
+        pending = {submit(primary)}
+        done, pending = wait(pending, timeout=self.hedge_after)
+        if not done or next(iter(done)).exception():
+            publish_event("llm_hedge", primary=primary.label, backup=backup.label)
+            pending.add(submit(backup))
+
+        last_error = None
+        for future in done:
+            last_error = future.exception()
+            if last_error is None:
+                return future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()  # the slower request keeps running; its result is discarded
+                last_error = future.exception()
+        raise last_error
+
     def _generate(
         self,
         messages: List[BaseMessage],
@@ -41,64 +197,97 @@ class RateLimitWrapper(BaseChatModel):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        global _last_request_time, _request_count, _rate_limit_callback
-        
-        with _rate_limit_lock:
-            current_time = time.time()
-            time_since_last = current_time - _last_request_time
-            if time_since_last < _min_delay:
-                sleep_time = _min_delay - time_since_last
-                print(f"⏱️  Rate limiting: Waiting {sleep_time:.1f}s (Request #{_request_count + 1})")
-                
-                # Notify callback if set
-                if _rate_limit_callback:
-                    try:
-                        _rate_limit_callback({
-                            "type": "rate_limit",
-                            "sleep_time": sleep_time,
-                            "request_number": _request_count + 1
-                        })
-                    except Exception as e:
-                        print(f"Warning: Rate limit callback failed: {e}")
-                
-                time.sleep(sleep_time)
-            
-            _last_request_time = time.time()
-            _request_count += 1
-            
-        return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        tools = kwargs.pop("_router_tools", None)
+        tool_kwargs = kwargs.pop("_router_tool_kwargs", None) or {}
+
+        last_error = None
+        for attempt in range(config.LLM_MAX_ATTEMPTS):
+            order = self._ordered_endpoints()
+            try:
+                if self.hedge_after and len(order) > 1:
+                    return self._hedged(order[0], order[1], messages, stop, tools, tool_kwargs, kwargs)
+                return self._call(order[0], messages, stop, run_manager, tools, tool_kwargs, kwargs)
+            except Exception as e:
+                if is_auth_error(e):
+                    # A revoked key is benched; fail over unless no other endpoint is usable
+                    if not any(ep.cooldown_until <= time.time() for ep in self.endpoints):
+                        raise
+                elif not is_retryable(e):
+                    raise
+                last_error = e
+                print(f"LLM call failed ({type(e).__name__}), failing over (attempt {attempt + 1}/{config.LLM_MAX_ATTEMPTS})")
+                publish_event("llm_failover", error=type(e).__name__, attempt=attempt + 1)
+        raise last_error
 
     @property
     def _llm_type(self) -> str:
-        return "rate_limited_gemini"
-        
+        return "routed"
+
     def bind_tools(self, tools, **kwargs):
-        # Let the underlying LLM handle the tool conversion/binding logic
-        binding = self.llm.bind_tools(tools, **kwargs)
-        
-        # Create a new binding that uses 'self' (the wrapper) but keeps the formatted tools
-        # We use the same class as the returned binding (usually RunnableBinding)
-        return binding.__class__(bound=self, kwargs=binding.kwargs, config=binding.config)
-
-def get_llm(model_name="gpt-4o-mini", provider=None):
-    """Get LLM instance based on provider"""
-    if provider is None:
-        provider = config.get_llm_provider()
-    
-    print(f"DEBUG: Using LLM Provider: {provider}")
+        # Tools are converted per endpoint at call time, since providers use different formats
+        return RunnableBinding(bound=self, kwargs={"_router_tools": tools, "_router_tool_kwargs": kwargs})
+
+def _api_keys(env_var: str) -> List[str]:
+    """Keys from <VAR> plus a comma-separated <VAR>S list (e.g. OPENAI_API_KEY and OPENAI_API_KEYS)"""
+    keys = [k.strip() for k in os.getenv(env_var + "S", "").split(",")]
+    keys.append((os.getenv(env_var) or "").strip())
+    return list(dict.fromkeys(k for k in keys if k))
 
+def _build_llm(provider: str, api_key: str, model_name: str) -> BaseChatModel:
     if provider == "gemini":
         # Allow user to override model via env var.
-        model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-        
-        llm = ChatGoogleGenerativeAI(
-            model=model_name, 
+        return ChatGoogleGenerativeAI(
+            model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+            google_api_key=api_key,
             temperature=0.1,
-            max_retries=5,
+            max_retries=1,  # failover is handled by the router
             request_timeout=120
         )
-        return RateLimitWrapper(llm=llm)
-    
-    # Default to OpenAI
-    return ChatOpenAI(model=model_name, temperature=0.1)
+    if provider == "openrouter":
+        return ChatOpenAI(
+            model=os.getenv("OPENROUTER_MODEL", f"openai/{model_name}"),
+            api_key=api_key,
+            base_url=OPENROUTER_BASE_URL,
+            temperature=0.1,
+            max_retries=1
+        )
+    return ChatOpenAI(model=model_name, api_key=api_key, temperature=0.1, max_retries=1)
+
+_PROVIDER_KEY_VARS = {"openai": "OPENAI_API_KEY", "gemini": "GEMINI_API_KEY", "openrouter": "OPENROUTER_API_KEY"}
+
+def get_endpoints(model_name: str, provider: Optional[str] = None) -> List[LLMEndpoint]:
+    """Endpoints for every configured key (optionally of a single provider)"""
+    providers = [provider] if provider else list(_PROVIDER_KEY_VARS)
+    endpoints = []
+    with _endpoints_lock:
+        for p in providers:
+            for key in _api_keys(_PROVIDER_KEY_VARS[p]):
+                cache_key = (p, key, model_name)
+                if cache_key not in _endpoints:
+                    key_state = _key_states.setdefault((p, key), APIKeyState(p, key[-4:]))
+                    _endpoints[cache_key] = LLMEndpoint(p, _build_llm(p, key, model_name), key_state)
+                endpoints.append(_endpoints[cache_key])
+    return endpoints
+
+def get_model_label(provider=None):
+    """Short description of the models a run uses, for tagging stored results"""
+    providers = [provider] if provider else [p for p, var in _PROVIDER_KEY_VARS.items() if _api_keys(var)]
+    labels = []
+    for p in providers or [config.get_llm_provider()]:
+        if p == "gemini":
+            labels.append(f"gemini:{os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')}")
+        elif p == "openrouter":
+            labels.append(f"openrouter:{os.getenv('OPENROUTER_MODEL', 'openai/gpt-4o-mini/gpt-4o')}")
+        else:
+            labels.append(f"{p}:gpt-4o-mini/gpt-4o")
+    return "+".join(labels)
+
+def get_llm(model_name="gpt-4o-mini", provider=None, hedge_after=None):
+    """Get an LLM that routes over all configured providers and keys"""
+    endpoints = get_endpoints(model_name, provider)
+    print(f"DEBUG: Using LLM endpoints: {[e.label for e in endpoints] or 'openai (default)'}")
 
+    if not endpoints:
+        # Default to OpenAI (picks up credentials the usual way, or fails on first call)
+        return ChatOpenAI(model=model_name, temperature=0.1)
+    return LLMRouter(endpoints=endpoints, hedge_after=hedge_after)
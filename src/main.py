@@ -44,15 +44,14 @@ load_dotenv()
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from src.graph import get_graph
+from src.graph import stream_pipeline
 from src.state import AgentState, InvestDebateState, RiskDebateState
 from src.config import config
-from langchain_core.messages import HumanMessage
 import datetime
 import uvicorn
 import threading
 from fastapi.middleware.cors import CORSMiddleware
-import traceback
+from typing import Optional
 
 app = FastAPI(title="Multi-Agent Trading System API")
 
@@ -67,8 +66,21 @@ app.add_middleware(
 class TradeRequest(BaseModel):
     ticker: str
     api_keys: dict
+    stream_mode: str = "full"  # "full" or "delta"
+    compression: Optional[str] = None  # None, "gzip" or "zstd"
+    trade_date: Optional[str] = None  # yyyy-mm-dd, defaults to today
+    deadline_seconds: Optional[float] = None  # the run degrades to always decide within this
+    max_age_seconds: Optional[float] = None  # reuse an identical stored run up to this old (0 = always run)
+    incremental: Optional[bool] = None  # skip nodes whose inputs are unchanged since an earlier run
 
 from fastapi.responses import StreamingResponse
+from src.streaming import EventStreamEncoder, compress_stream, get_compressor
+from src.events import start_run_thread
+from src.singleflight import cached_run_events, get_fresh_run, run_config_key, run_flights, run_key
+from src.run_store import run_store, REPORT_FIELDS
+from src.resilience import get_breaker_states
+from src.jobs import TERMINAL_STATUSES, get_job_queue
+from src.prewarm import get_prewarm_scheduler
 import json
 
 @app.post("/trade")
@@ -80,93 +92,188 @@ async def run_trade(request: TradeRequest):
         config.validate_config()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        encoder = EventStreamEncoder(request.stream_mode, config.STREAM_SNAPSHOT_INTERVAL)
+        compressor = get_compressor(request.compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    initial_state = {
-        "company_of_interest": request.ticker,
-        "trade_date": datetime.datetime.now().strftime("%Y-%m-%d"),
-        "sender": "User",
-        "messages": [HumanMessage(content=f"Analyze {request.ticker}")],
-        "market_report": "",
-        "sentiment_report": "",
-        "news_report": "",
-        "fundamentals_report": "",
-        "investment_plan": "",
-        "trader_investment_plan": "",
-        "final_trade_decision": "",
-        "investment_debate_state": {
-            "bull_history": "",
-            "bear_history": "",
-            "history": "",
-            "current_response": "",
-            "judge_decision": "",
-            "count": 0
-        },
-        "risk_debate_state": {
-            "risky_history": "",
-            "safe_history": "",
-            "neutral_history": "",
-            "history": "",
-            "latest_speaker": "",
-            "current_risky_response": "",
-            "current_safe_response": "",
-            "current_neutral_response": "",
-            "judge_decision": "",
-            "count": 0
-        }
-    }
+    trade_date = request.trade_date or datetime.datetime.now().strftime("%Y-%m-%d")
+
+    config_key = run_config_key(request.deadline_seconds)
+    cached = get_fresh_run(request.ticker, trade_date, config_key, request.max_age_seconds)
+
+    def start(bus):
+        # The graph runs in its own thread so that events published by any layer
+        # (rate limiter, tools, nodes) reach the client as they happen
+        start_run_thread(bus, stream_pipeline, bus, request.ticker, trade_date, request.deadline_seconds, config_key,
+                         request.incremental)
 
     def event_stream():
-        import queue
-        rate_limit_queue = queue.Queue()
-        
-        def rate_limit_callback(data):
-            rate_limit_queue.put(data)
-        
-        try:
-            # Import and set the rate limit callback
-            from src.llm_utils import set_rate_limit_callback
-            set_rate_limit_callback(rate_limit_callback)
-            
-            graph = get_graph()
-            
-            # Use stream to get updates from each node
-            for event in graph.stream(initial_state):
-                # Check for any rate limit events
-                while not rate_limit_queue.empty():
-                    try:
-                        rate_data = rate_limit_queue.get_nowait()
-                        yield json.dumps({
-                            "type": "rate_limit",
-                            "message": f"⏱️ Rate limiting: Waiting {rate_data['sleep_time']:.1f}s (Request #{rate_data['request_number']})",
-                            "sleep_time": rate_data['sleep_time'],
-                            "request_number": rate_data['request_number']
-                        }) + "\n"
-                    except queue.Empty:
-                        break
-                
-                # event is a dict like {'Node Name': {'updated_key': 'value'}}
-                for node_name, data in event.items():
-                    # Create a simplified event object for the frontend
-                    payload = {
-                        "type": "update",
-                        "node": node_name,
-                        "data": data
-                    }
-                    yield json.dumps(payload, default=str) + "\n"
-            
-            # Signal completion
-            yield json.dumps({"type": "complete"}) + "\n"
-            
-        except Exception as e:
-            print("Error running trade workflow:")
-            traceback.print_exc()
-            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
-        finally:
-            # Clear the callback
-            from src.llm_utils import set_rate_limit_callback
-            set_rate_limit_callback(None)
-
-    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+        if cached:
+            for event in cached_run_events(cached):
+                yield encoder.encode(event)
+            return
+        # The same run may be running as a job on a worker process: follow its events. Queued jobs
+        # are not joined, as workers are optional and the job may wait behind the whole queue.
+        queue = get_job_queue()
+        job = queue.find_running(request.ticker, trade_date, config_key)
+        if job:
+            yield encoder.encode({"type": "attached", "ticker": request.ticker.upper(), "trade_date": trade_date,
+                                  "job_id": job["job_id"]})
+            for event in queue.follow(job["job_id"], stop_if_queued=True):
+                event.pop("seq", None)  # the job's own numbering; the encoder numbers this stream
+                yield encoder.encode(event)
+            if (queue.get(job["job_id"]) or {}).get("status") in TERMINAL_STATUSES:
+                return
+            # The worker died and the job went back to the queue: run it here instead
+            yield encoder.encode({"type": "detached", "job_id": job["job_id"], "reason": "job was requeued"})
+        # Identical requests share one run; it finishes (and is stored) even if its clients leave
+        bus, started = run_flights.join(run_key(request.ticker, trade_date, config_key), start)
+        if not started:
+            yield encoder.encode({"type": "attached", "ticker": request.ticker.upper(), "trade_date": trade_date})
+        for event in bus.subscribe():
+            yield encoder.encode(event)
+
+    headers = {"Content-Encoding": request.compression} if request.compression else None
+    return StreamingResponse(compress_stream(event_stream(), compressor),
+                             media_type="application/x-ndjson", headers=headers)
+
+class ScreenRequest(BaseModel):
+    symbols: list
+    trade_date: Optional[str] = None
+    top_k: Optional[int] = None
+
+@app.post("/screen")
+def screen(request: ScreenRequest):
+    from src.screener import screen_universe
+    ranked = screen_universe(request.symbols, request.trade_date, request.top_k)
+    columns = ["score", "bias", "last_close", "momentum_20d", "volatility_breakout",
+               "price_breakout", "volume_spike", "rsi_14"]
+    if ranked.empty:
+        return []
+    return [{"ticker": symbol, **json.loads(row[columns].to_json())} for symbol, row in ranked.iterrows()]
+
+class JobRequest(BaseModel):
+    ticker: str
+    trade_date: Optional[str] = None  # yyyy-mm-dd, defaults to today
+    deadline_seconds: Optional[float] = None
+    max_age_seconds: Optional[float] = None  # reuse an identical stored run up to this old (0 = always run)
+    incremental: Optional[bool] = None  # skip nodes whose inputs are unchanged since an earlier run
+
+@app.post("/jobs")
+def submit_job(request: JobRequest):
+    # Workers use the API keys from their own environment
+    trade_date = request.trade_date or datetime.datetime.now().strftime("%Y-%m-%d")
+    params = {"deadline_seconds": request.deadline_seconds, "config_key": run_config_key(request.deadline_seconds),
+              "incremental": request.incremental, "max_age_seconds": request.max_age_seconds}
+    queue = get_job_queue()
+
+    cached = get_fresh_run(request.ticker, trade_date, params["config_key"], request.max_age_seconds)
+    if cached:
+        job_id = queue.add_completed(request.ticker, trade_date, params, cached["run_id"], cached_run_events(cached))
+        return {"job_id": job_id, "status": "done", "cached": True}
+
+    job_id, created = queue.submit_once(request.ticker, trade_date, params)
+    return {"job_id": job_id, "status": "queued" if created else queue.get(job_id)["status"], "deduplicated": not created}
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, ticker: Optional[str] = None, limit: int = 50):
+    return get_job_queue().list_jobs(status=status, ticker=ticker, limit=limit)
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return _get_job_or_404(job_id)
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = _get_job_or_404(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    record = run_store.get_run(job["run_id"])
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Run {job['run_id']} not found")
+    return record
+
+@app.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str, offset: int = 0, compression: Optional[str] = None):
+    """
+    The job's events as NDJSON, starting after `offset` and following the job live until it
+    finishes. Each event carries its 'seq'; reconnect with offset=<last seq seen> to resume.
+    """
+    _get_job_or_404(job_id)
+    try:
+        compressor = get_compressor(compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lines = (json.dumps(event, default=str) + "\n" for event in get_job_queue().follow(job_id, offset))
+    headers = {"Content-Encoding": compression} if compression else None
+    return StreamingResponse(compress_stream(lines, compressor), media_type="application/x-ndjson", headers=headers)
+
+@app.on_event("startup")
+def start_prewarm_scheduler():
+    if config.PREWARM_WATCHLIST:
+        get_prewarm_scheduler().start()
+
+class PrewarmRequest(BaseModel):
+    symbols: Optional[list] = None  # replaces the watchlist
+    trade_date: Optional[str] = None
+
+@app.post("/prewarm")
+def prewarm(request: PrewarmRequest):
+    """Warm the data caches for the watchlist now, in the background"""
+    scheduler = get_prewarm_scheduler()
+    if request.symbols:
+        scheduler.set_watchlist(request.symbols)
+    if not scheduler.watchlist:
+        raise HTTPException(status_code=400, detail="Watchlist is empty")
+    threading.Thread(target=scheduler.warm, args=(request.trade_date,), daemon=True).start()
+    return {"started": True, "watchlist": scheduler.watchlist}
+
+@app.get("/prewarm/status")
+def prewarm_status():
+    return get_prewarm_scheduler().readiness()
+
+@app.get("/health/sources")
+async def get_source_health():
+    return get_breaker_states()
+
+@app.get("/runs")
+async def list_runs(ticker: Optional[str] = None, trade_date: Optional[str] = None,
+                    decision: Optional[str] = None, model: Optional[str] = None, limit: int = 50):
+    return run_store.list_runs(ticker=ticker, trade_date=trade_date, decision=decision, model=model, limit=limit)
+
+@app.get("/runs/latest")
+async def get_latest_run(ticker: str, trade_date: Optional[str] = None):
+    record = run_store.get_latest(ticker, trade_date=trade_date)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No stored run for {ticker}")
+    return record
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    record = run_store.get_run(run_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return record
+
+@app.get("/runs/{run_id}/reports/{field}")
+async def get_run_report(run_id: str, field: str):
+    if field not in REPORT_FIELDS:
+        raise HTTPException(status_code=404, detail=f"Unknown report '{field}'. Expected one of {REPORT_FIELDS}")
+    record = run_store.get_run(run_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return {"run_id": run_id, "field": field, "content": record["reports"].get(field, "")}
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
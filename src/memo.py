@@ -0,0 +1,101 @@
+import contextvars
+import copy
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from src.config import config
+from src.budget import get_current_budget
+from src.events import publish_event
+from src.resilience import ResultCache
+
+_REPORTS = ["market_report", "sentiment_report", "news_report", "fundamentals_report"]
+
+# State fields each node reads. A node's output is reused when exactly these fields are unchanged.
+# Analysts are memoized inside the analyst node on the messages they are given (see analyst.py).
+NODE_INPUTS: Dict[str, List[str]] = {
+    "Bull Researcher": _REPORTS + ["investment_debate_state"],
+    "Bear Researcher": _REPORTS + ["investment_debate_state"],
+    "Research Manager": ["investment_debate_state"],
+    "Trader": ["investment_plan"],
+    "Risky Analyst": ["trader_investment_plan", "risk_debate_state"],
+    "Safe Analyst": ["trader_investment_plan", "risk_debate_state"],
+    "Neutral Analyst": ["trader_investment_plan", "risk_debate_state"],
+    "Risk Judge": ["trader_investment_plan", "risk_debate_state"],
+}
+
+_incremental: contextvars.ContextVar = contextvars.ContextVar("incremental_run", default=False)
+
+node_memo = ResultCache(os.path.join(config.DATA_CACHE_DIR, "node_memo"), max_entries=config.NODE_MEMO_MAX_ENTRIES)
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+def fingerprint(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _memo_key(node_name: str, inputs: Dict[str, Any]) -> str:
+    # Outputs also depend on the models and debate settings
+    from src.singleflight import run_config_key
+    return f"{node_name}|{run_config_key()}|{fingerprint(inputs)}"
+
+def incremental_enabled() -> bool:
+    return _incremental.get()
+
+@contextmanager
+def incremental_mode(enabled: bool):
+    """Reuse memoized node outputs for code executed inside the block"""
+    token = _incremental.set(enabled)
+    try:
+        yield enabled
+    finally:
+        _incremental.reset(token)
+
+def lookup(node_name: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The node's stored output for these exact inputs, or None (always None outside incremental mode)"""
+    if not _incremental.get():
+        return None
+    cached = node_memo.get(_memo_key(node_name, inputs), max_age=config.NODE_MEMO_TTL_SECONDS)
+    if cached is None:
+        return None
+    publish_event("node_cached", node=node_name)
+    return copy.deepcopy(cached[0])
+
+def store(node_name: str, inputs: Dict[str, Any], output: Dict[str, Any]):
+    """Remember a node's output for these inputs (and now and then drop expired ones)"""
+    global _last_prune
+    node_memo.put(_memo_key(node_name, inputs), output)
+    with _prune_lock:
+        if time.time() - _last_prune < config.NODE_MEMO_PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = time.time()
+    removed = node_memo.prune(config.NODE_MEMO_TTL_SECONDS)
+    if removed:
+        print(f"Pruned {removed} expired node memo entries")
+
+def memoize_node(name: str, node):
+    """Wrap a graph node listed in NODE_INPUTS so unchanged inputs skip it in incremental runs"""
+    fields = NODE_INPUTS.get(name)
+    if fields is None:
+        return node
+
+    @functools.wraps(node)
+    def memoized(state):
+        if not _incremental.get():
+            return node(state)
+        inputs = {field: state.get(field) for field in fields}
+        cached = lookup(name, inputs)
+        if cached is not None:
+            return cached
+        budget = get_current_budget()
+        degradations = len(budget.degradations) if budget else 0
+        output = node(state)
+        # Don't let a later run reuse a result that was cut short to meet a deadline
+        if budget is None or len(budget.degradations) == degradations:
+            store(name, inputs, output)
+        return output
+    return memoized
@@ -0,0 +1,90 @@
+import contextvars
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from src.config import config
+from src.tools.market_tools import toolkit
+
+def _days_before(date_str: str, days: int) -> str:
+    return (datetime.date.fromisoformat(date_str) - datetime.timedelta(days=days)).isoformat()
+
+def _day_after(date_str: str) -> str:
+    return (datetime.date.fromisoformat(date_str) + datetime.timedelta(days=1)).isoformat()
+
+def _price_window(ticker, trade_date):
+    return {"symbol": ticker, "start_date": _days_before(trade_date, config.PREFETCH_PRICE_LOOKBACK_DAYS),
+            "end_date": _day_after(trade_date)}
+
+# The tool calls each analyst (almost) always makes, as (tool, args builder) pairs
+PREFETCH_PLAN = {
+    "market": [
+        (toolkit.get_yfinance_data, _price_window),
+        (toolkit.get_technical_indicators, _price_window),
+    ],
+    "social": [
+        (toolkit.get_social_media_sentiment, lambda t, d: {"ticker": t, "trade_date": d}),
+    ],
+    "news": [
+        (toolkit.get_finnhub_news, lambda t, d: {"ticker": t, "start_date": _days_before(d, config.PREFETCH_NEWS_LOOKBACK_DAYS),
+                                                 "end_date": d}),
+        (toolkit.get_macroeconomic_news, lambda t, d: {"trade_date": d}),
+    ],
+    "fundamentals": [
+        (toolkit.get_fundamental_analysis, lambda t, d: {"ticker": t, "trade_date": d}),
+    ],
+}
+
+_executor = ThreadPoolExecutor(max_workers=config.PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+# (ticker, trade_date) -> (started at, {analyst: [(tool name, args, future)]}); bounded so old runs fall out
+_prefetches: "OrderedDict[tuple, tuple]" = OrderedDict()
+_MAX_TRACKED_RUNS = 64
+
+def start_prefetch(ticker: str, trade_date: str):
+    """
+    Start every planned tool call for a run in parallel. Runs for the same ticker and date
+    started within PREFETCH_REUSE_SECONDS share one prefetch; a later re-run fetches fresh
+    data. Each call runs in a copy of the caller's context, so event bus and point-in-time
+    settings carry over.
+    """
+    key = (ticker.upper(), trade_date)
+    with _lock:
+        if key in _prefetches and time.time() - _prefetches[key][0] < config.PREFETCH_REUSE_SECONDS:
+            _prefetches.move_to_end(key)
+            return
+        calls = {}
+        for analyst, plan in PREFETCH_PLAN.items():
+            calls[analyst] = []
+            for tool, build_args in plan:
+                args = build_args(key[0], trade_date)
+                ctx = contextvars.copy_context()
+                calls[analyst].append((tool.name, args, _executor.submit(ctx.run, tool.invoke, args)))
+        _prefetches[key] = (time.time(), calls)
+        _prefetches.move_to_end(key)
+        while len(_prefetches) > _MAX_TRACKED_RUNS:
+            _prefetches.popitem(last=False)
+
+def get_prefetched(ticker: str, trade_date: str, analyst: str, timeout: Optional[float] = None) -> Optional[str]:
+    """Formatted results of an analyst's prefetched tool calls, or None if nothing was prefetched"""
+    with _lock:
+        calls = _prefetches.get((ticker.upper(), trade_date), (None, {}))[1].get(analyst)
+    if not calls:
+        return None
+
+    wait([future for _, _, future in calls],
+         timeout=config.PREFETCH_TIMEOUT_SECONDS if timeout is None else timeout)
+    sections = []
+    for name, args, future in calls:
+        if not future.done():
+            continue  # still running: the analyst can call the tool itself
+        try:
+            result = future.result()
+        except Exception as e:
+            result = f"Error: {e}"
+        arg_str = ", ".join(f"{k}={v}" for k, v in args.items())
+        sections.append(f"### {name}({arg_str})\n{result}")
+    return "\n\n".join(sections) or None
@@ -0,0 +1,230 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.config import config
+from src.prefetch import PREFETCH_PLAN
+from src.resilience import refreshing_cache
+
+# Data source behind each tool, to know how long a warmed result stays fresh
+_TOOL_SOURCES = {
+    "get_yfinance_data": "yfinance",
+    "get_technical_indicators": "yfinance",
+    "get_finnhub_news": "finnhub",
+    "get_social_media_sentiment": "tavily",
+    "get_fundamental_analysis": "tavily",
+    "get_macroeconomic_news": "tavily",
+}
+
+def _freshness(tool_name: str) -> float:
+    source = _TOOL_SOURCES.get(tool_name)
+    if source == "yfinance":
+        return config.PRICE_CACHE_TTL_SECONDS
+    return config.TOOL_CACHE_FRESH_SECONDS.get(source, 0)
+
+def _failed(tool_name: str, result) -> bool:
+    # The tools report problems as text for the LLM rather than raising
+    if _TOOL_SOURCES.get(tool_name) == "tavily":
+        return not isinstance(result, list)  # successful searches are lists of results
+    text = str(result)
+    return text.startswith(("Error", "No data", "FINNHUB_API_KEY not found"))
+
+def warm_tasks(tickers: List[str], trade_date: str) -> List[tuple]:
+    """
+    (ticker or None, tool, args) for every tool call the analysts' prefetch makes for these tickers,
+    with the same arguments so the runs hit the same cache entries. Calls that don't depend on
+    the ticker (macro news) appear once, with ticker None.
+    """
+    tasks, seen = [], set()
+    for ticker in tickers:
+        for plan in PREFETCH_PLAN.values():
+            for tool, build_args in plan:
+                args = build_args(ticker, trade_date)
+                shared = "ticker" not in args and "symbol" not in args
+                key = (tool.name, json.dumps(args, sort_keys=True))
+                if key in seen:
+                    continue
+                seen.add(key)
+                tasks.append((None if shared else ticker, tool, args))
+    return tasks
+
+class PrewarmScheduler:
+    """
+    Fetches price history, indicators, Finnhub news, macro news and Tavily searches for a
+    watchlist into the local caches (DATA_CACHE_DIR and the tool result cache) at the
+    PREWARM_TIMES on weekdays, so the first runs of the day only wait on the LLMs.
+
+    At most PREWARM_MAX_WORKERS calls run at once; the sources' circuit breakers and retries
+    apply as in a run. readiness() reports which cache entries are warm and still fresh.
+    """
+
+    def __init__(self, watchlist: List[str], times: Optional[List[str]] = None, max_workers: Optional[int] = None):
+        self.watchlist = [t.upper() for t in watchlist]
+        self.times = sorted(times if times is not None else config.PREWARM_TIMES)
+        self.max_workers = max_workers or config.PREWARM_MAX_WORKERS
+        self.trade_date: Optional[str] = None
+        self.last_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+        self._status: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def set_watchlist(self, watchlist: List[str]):
+        self.watchlist = [t.upper() for t in watchlist]
+
+    def _run_task(self, ticker, tool, args):
+        started = time.time()
+        try:
+            # Always fetch (so the entry's age is known) and tag the result as pre-warmed
+            with refreshing_cache():
+                result = tool.invoke(args)
+            error = str(result)[:200] if _failed(tool.name, result) else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        with self._lock:
+            self._status[(ticker, tool.name)] = {
+                "status": "error" if error else "ok",
+                "error": error,
+                "warmed_at": time.time(),
+                "seconds": round(time.time() - started, 2),
+            }
+
+    def warm(self, trade_date: Optional[str] = None) -> Dict[str, Any]:
+        """Warm the caches for the whole watchlist now (skipped if a warm-up is already running)"""
+        if not self._warm_lock.acquire(blocking=False):
+            return self.readiness()
+        try:
+            trade_date = trade_date or datetime.date.today().isoformat()
+            tasks = warm_tasks(self.watchlist, trade_date)
+            with self._lock:
+                if trade_date != self.trade_date:
+                    self._status = {}
+                self.trade_date = trade_date
+                for ticker, tool, _ in tasks:
+                    self._status.setdefault((ticker, tool.name), {"status": "pending"})
+            self.last_started = time.time()
+            print(f"Pre-warming {len(tasks)} data calls for {len(self.watchlist)} tickers ({trade_date})")
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prewarm") as executor:
+                for task in tasks:
+                    executor.submit(self._run_task, *task)
+            self.last_finished = time.time()
+            summary = self.readiness()
+            print(f"Pre-warm done in {self.last_finished - self.last_started:.1f}s: "
+                  f"{summary['ready_calls']}/{summary['total_calls']} calls ready")
+            return summary
+        finally:
+            self._warm_lock.release()
+
+    def readiness(self) -> Dict[str, Any]:
+        """Per ticker: which data is cached and still fresh enough to be served without a call"""
+        now = time.time()
+        tickers: Dict[str, Dict[str, Any]] = {t: {} for t in self.watchlist}
+        shared: Dict[str, Any] = {}
+        with self._lock:
+            status = dict(self._status)
+        ready_calls = 0
+        for (ticker, tool_name), entry in status.items():
+            entry = dict(entry)
+            if entry.get("warmed_at"):
+                entry["age_seconds"] = round(now - entry["warmed_at"], 1)
+                entry["fresh"] = entry["status"] == "ok" and entry["age_seconds"] < _freshness(tool_name)
+            else:
+                entry["fresh"] = False
+            ready_calls += entry["fresh"]
+            (shared if ticker is None else tickers.setdefault(ticker, {}))[tool_name] = entry
+        return {
+            "trade_date": self.trade_date,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "next_run": self.next_run().isoformat(timespec="minutes") if self.times else None,
+            "ready": bool(status) and ready_calls == len(status),
+            "ready_calls": ready_calls,
+            "total_calls": len(status),
+            "tickers": {t: {"ready": bool(calls) and all(c["fresh"] for c in calls.values()), "calls": calls}
+                        for t, calls in tickers.items()},
+            "shared": shared,
+        }
+
+    def next_run(self, now: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+        """Next scheduled warm-up (local time, weekdays only)"""
+        now = now or datetime.datetime.now()
+        for days in range(8):
+            date = now.date() + datetime.timedelta(days=days)
+            if date.weekday() >= 5:
+                continue
+            for at in self.times:
+                hour, minute = map(int, at.split(":"))
+                run_at = datetime.datetime.combine(date, datetime.time(hour, minute))
+                if run_at > now:
+                    return run_at
+        return None
+
+    def _loop(self):
+        while True:
+            run_at = self.next_run()
+            if run_at is None:
+                return
+            if self._stop.wait((run_at - datetime.datetime.now()).total_seconds()):
+                return
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Pre-warm failed: {e}")
+
+    def start(self):
+        """Run warm-ups at the scheduled times in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not self.times:
+            print("Pre-warm: no scheduled times, warm-ups only run on demand")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="prewarm-scheduler", daemon=True)
+        self._thread.start()
+        print(f"Pre-warm scheduled for {', '.join(self.watchlist)}; next run {self.next_run():%Y-%m-%d %H:%M}")
+
+    def stop(self):
+        self._stop.set()
+
+prewarm_scheduler = None
+
+def get_prewarm_scheduler() -> PrewarmScheduler:
+    global prewarm_scheduler
+    if prewarm_scheduler is None:
+        prewarm_scheduler = PrewarmScheduler(config.PREWARM_WATCHLIST)
+    return prewarm_scheduler
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm data caches for a watchlist")
+    parser.add_argument("tickers", nargs="*", help="Watchlist (default PREWARM_WATCHLIST)")
+    parser.add_argument("--at", action="append", help="Local HH:MM on weekdays, repeatable (default PREWARM_TIMES)")
+    parser.add_argument("--now", action="store_true", help="Warm once now, print readiness and exit")
+    parser.add_argument("--date", help="yyyy-mm-dd trade date for --now (default today)")
+    args = parser.parse_args()
+
+    scheduler = PrewarmScheduler(args.tickers or config.PREWARM_WATCHLIST, times=args.at)
+    if not scheduler.watchlist:
+        parser.error("no tickers given and PREWARM_WATCHLIST is empty")
+    if args.now:
+        print(json.dumps(scheduler.warm(args.date), indent=2))
+        return
+    if not scheduler.times:
+        parser.error("no --at times given and PREWARM_TIMES is empty")
+    scheduler.start()
+    try:
+        while scheduler._thread.is_alive():
+            scheduler._thread.join(timeout=1)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+if __name__ == "__main__":
+    main()
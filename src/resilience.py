@@ -0,0 +1,272 @@
+import contextvars
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from src.config import config
+from src.events import publish_event
+
+_RETRYABLE_ERRORS = ("RateLimit", "ResourceExhausted", "ServiceUnavailable", "InternalServerError",
+                     "Timeout", "APIConnectionError", "ConnectionError", "DeadlineExceeded")
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status carried by an SDK/HTTP exception, if any"""
+    for candidate in (error, getattr(error, "response", None)):
+        code = getattr(candidate, "status_code", None) or getattr(candidate, "code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After response header, if the error carries one"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    """429s, 5xx, timeouts and transport errors are transient; anything else is not"""
+    code = status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    return any(name in type(error).__name__ for name in _RETRYABLE_ERRORS)
+
+def is_auth_error(error: Exception) -> bool:
+    """401/403 and SDK authentication/permission errors (revoked or invalid key)"""
+    code = status_code(error)
+    if code is not None:
+        return code in (401, 403)
+    return any(name in type(error).__name__ for name in ("Authentication", "PermissionDenied", "Unauthenticated"))
+
+class SourceUnavailable(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker for one data source, shared by all runs.
+    After `failure_threshold` consecutive transient failures calls fail fast for
+    `reset_timeout` seconds, then a single trial call decides whether to close again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.time() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_timeout - (time.time() - self.opened_at), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_in_flight:
+                    print(f"Circuit breaker '{self.name}' opened after {self.failures} failures")
+                self.opened_at = time.time()
+            self._trial_in_flight = False
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="source-call")
+
+def get_breaker(source: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if source not in _breakers:
+            _breakers[source] = CircuitBreaker(source, config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_SECONDS)
+        return _breakers[source]
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: {"state": b.state, "failures": b.failures, "retry_in_seconds": round(b.retry_in(), 1)}
+            for name, b in _breakers.items()}
+
+class ResultCache:
+    """
+    Last good result per call, kept in memory and in DATA_CACHE_DIR so restarts keep it.
+    Entries written by a pre-warm are tagged so callers can tell them from results of earlier runs.
+    With `max_entries` only that many entries stay in memory (least recently used are dropped,
+    the files remain); prune() deletes old files.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: Optional[int] = None):
+        self.directory = directory or os.path.join(config.DATA_CACHE_DIR, "tool_results")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, entry: tuple):
+        # Caller holds self._lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while self.max_entries and len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _entry(self, key: str, max_age: Optional[float]):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key)) as f:
+                    stored = json.load(f)
+                entry = (stored["value"], stored["saved_at"], stored.get("warmed", False))
+                with self._lock:
+                    self._remember(key, entry)
+            except (OSError, ValueError, KeyError):
+                return None
+        if entry is None or (max_age is not None and time.time() - entry[1] > max_age):
+            return None
+        return entry
+
+    def get(self, key: str, max_age: Optional[float] = None):
+        """(value, saved_at) or None if missing or older than max_age seconds"""
+        entry = self._entry(key, max_age)
+        return entry[:2] if entry else None
+
+    def get_warmed(self, key: str, max_age: float):
+        """The value if it was stored by a pre-warm less than max_age seconds ago, else None"""
+        entry = self._entry(key, max_age)
+        return entry[0] if entry and entry[2] else None
+
+    def put(self, key: str, value, warmed: bool = False):
+        saved_at = time.time()
+        with self._lock:
+            self._remember(key, (value, saved_at, warmed))
+        tmp_path = self._path(key) + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "saved_at": saved_at, "warmed": warmed, "value": value}, f, default=str)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: could not persist cached result for {key}: {e}")
+
+    def prune(self, max_age: float) -> int:
+        """Delete entries saved more than max_age seconds ago; returns the number of files removed"""
+        cutoff = time.time() - max_age
+        with self._lock:
+            for key in [k for k, entry in self._memory.items() if entry[1] < cutoff]:
+                del self._memory[key]
+        removed = 0
+        try:
+            files = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        for f in files:
+            try:
+                if f.name.endswith((".json", ".tmp")) and f.stat().st_mtime < cutoff:
+                    os.remove(f.path)
+                    removed += 1
+            except OSError:
+                continue  # removed concurrently or still being written
+        return removed
+
+result_cache = ResultCache()
+
+_refreshing: contextvars.ContextVar = contextvars.ContextVar("refreshing_cache", default=False)
+
+@contextmanager
+def refreshing_cache():
+    """
+    Inside the block call_source always calls the source and tags what it stores as pre-warmed
+    (used by the pre-warm scheduler)
+    """
+    token = _refreshing.set(True)
+    try:
+        yield
+    finally:
+        _refreshing.reset(token)
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(config.TOOL_BACKOFF_MAX_SECONDS, config.TOOL_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def call_source(source: str, fn: Callable, *args, cache_key: Optional[str] = None, **kwargs):
+    """
+    Call a data source through its circuit breaker with a timeout and jittered, Retry-After
+    aware retries. Successful results are remembered under `cache_key`. Results stored by a
+    pre-warm are served without a call for TOOL_CACHE_FRESH_SECONDS[source]; anything else
+    is fetched live. When the source is down (breaker open or retries exhausted) the last good
+    result is returned instead. Raises SourceUnavailable if there is nothing to fall back to.
+    """
+    breaker = get_breaker(source)
+    timeout = config.TOOL_TIMEOUT_SECONDS.get(source, 30)
+
+    fresh_for = config.TOOL_CACHE_FRESH_SECONDS.get(source)
+    if cache_key and fresh_for and not _refreshing.get():
+        warmed = result_cache.get_warmed(cache_key, max_age=fresh_for)
+        if warmed is not None:
+            return warmed
+
+    def fallback(reason: str):
+        cached = result_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            publish_event("source_fallback", source=source, reason=reason, cached_at=cached[1])
+            return cached[0]
+        raise SourceUnavailable(f"{source} unavailable: {reason}")
+
+    if not breaker.allow():
+        return fallback(f"circuit open, retry in {breaker.retry_in():.0f}s")
+
+    last_error = None
+    for attempt in range(config.TOOL_MAX_ATTEMPTS):
+        try:
+            ctx = contextvars.copy_context()
+            result = _executor.submit(ctx.run, fn, *args, **kwargs).result(timeout=timeout)
+        except Exception as e:
+            last_error = e
+            if not is_retryable(e):
+                breaker.record_success()  # the source answered; the request itself was bad
+                raise
+            delay = retry_after(e) or _backoff_delay(attempt)
+            if attempt == config.TOOL_MAX_ATTEMPTS - 1 or delay > config.TOOL_BACKOFF_MAX_SECONDS:
+                break
+            print(f"{source} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        if cache_key:
+            result_cache.put(cache_key, result, warmed=_refreshing.get())
+        return result
+
+    breaker.record_failure()
+    return fallback(f"{type(last_error).__name__}: {last_error}")
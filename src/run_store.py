@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional
+
+from src.config import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+# Fields of AgentState that make up a finished run (messages are transient and not stored)
+REPORT_FIELDS = [
+    "market_report",
+    "sentiment_report",
+    "news_report",
+    "fundamentals_report",
+    "investment_plan",
+    "trader_investment_plan",
+    "final_trade_decision",
+]
+DEBATE_FIELDS = ["investment_debate_state", "risk_debate_state"]
+
+INDEX_FIELDS = ["ticker", "trade_date", "decision", "model", "config_key"]
+
+_FINAL_LINE = re.compile(r"FINAL (?:DECISION|TRANSACTION PROPOSAL)\s*:\s*\**\s*(BUY|SELL|HOLD)\b", re.IGNORECASE)
+
+def extract_decision(text: str) -> str:
+    """
+    Pull BUY/SELL/HOLD out of a decision text: the closing 'FINAL DECISION: **X**' (or the
+    Trader's 'FINAL TRANSACTION PROPOSAL') line, else the last bolded or plain mention
+    """
+    if not text:
+        return "UNKNOWN"
+    for pattern in (_FINAL_LINE, r"\*\*\s*(BUY|SELL|HOLD)\s*\*\*", r"\b(BUY|SELL|HOLD)\b"):
+        matches = re.findall(pattern, text, re.IGNORECASE) if isinstance(pattern, str) else pattern.findall(text)
+        if matches:
+            return matches[-1].upper()
+    return "UNKNOWN"
+
+class RunStore:
+    """
+    Append-only store of finished runs in RESULTS_DIR.
+
+    runs.dat holds one zlib-compressed JSON record per run, back to back.
+    runs.idx is a JSONL index (one small line per run: index fields + byte offset/length
+    into runs.dat). The index is kept in memory and incrementally re-read when another
+    process appends, so lookups by ticker/date/decision/model never touch the data file,
+    and fetching a run is a single seek + read.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or config.RESULTS_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.data_path = os.path.join(self.directory, "runs.dat")
+        self.index_path = os.path.join(self.directory, "runs.idx")
+        self._lock = threading.Lock()
+        self._index_pos = 0
+        self._entries: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_field: Dict[str, Dict[str, List[Dict[str, Any]]]] = {f: {} for f in INDEX_FIELDS}
+
+    def _add_entry(self, entry: Dict[str, Any]):
+        self._entries.append(entry)
+        self._by_id[entry["run_id"]] = entry
+        for field in INDEX_FIELDS:
+            self._by_field[field].setdefault(entry.get(field), []).append(entry)
+
+    def _refresh(self):
+        """Load index lines appended since the last read (by this or another process)"""
+        if not os.path.exists(self.index_path):
+            return
+        if os.path.getsize(self.index_path) == self._index_pos:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            lines = f.readlines()
+        # Stat the data file after reading the index: an entry's record is written before its line
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        for line in lines:
+            if not line.endswith(b"\n"):
+                break  # partially written line, pick it up next time
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                self._index_pos += len(line)
+                continue
+            if entry["offset"] + entry["length"] > data_size:
+                break  # record not fully visible yet, retry from this line next time
+            self._index_pos += len(line)
+            self._add_entry(entry)
+
+    def save_run(self, state: Dict[str, Any], model: str = "", duration_seconds: Optional[float] = None,
+                 extra: Optional[Dict[str, Any]] = None) -> str:
+        """Persist a finished run and return its id"""
+        run_id = uuid.uuid4().hex
+        record = {
+            "run_id": run_id,
+            "ticker": state.get("company_of_interest", "").upper(),
+            "trade_date": state.get("trade_date", ""),
+            "decision": extract_decision(state.get("final_trade_decision", "")),
+            "model": model,
+            "created_at": time.time(),
+            "duration_seconds": duration_seconds,
+            "reports": {field: state.get(field, "") for field in REPORT_FIELDS},
+            "debates": {field: state.get(field, {}) for field in DEBATE_FIELDS},
+        }
+        if extra:
+            record.update(extra)
+        blob = zlib.compress(json.dumps(record, default=str).encode("utf-8"))
+
+        with self._lock:
+            with open(self.data_path, "ab") as data_file, open(self.index_path, "ab") as index_file:
+                # Serialize appends across processes sharing RESULTS_DIR
+                if fcntl:
+                    fcntl.flock(index_file, fcntl.LOCK_EX)
+                try:
+                    data_file.seek(0, os.SEEK_END)
+                    offset = data_file.tell()
+                    data_file.write(blob)
+                    data_file.flush()
+                    os.fsync(data_file.fileno())
+
+                    entry = {f: record.get(f) for f in ["run_id", "created_at"] + INDEX_FIELDS}
+                    entry.update({"offset": offset, "length": len(blob)})
+                    index_file.write((json.dumps(entry) + "\n").encode("utf-8"))
+                    index_file.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(index_file, fcntl.LOCK_UN)
+            self._refresh()
+        return run_id
+
+    def list_runs(self, ticker: Optional[str] = None, trade_date: Optional[str] = None,
+                  decision: Optional[str] = None, model: Optional[str] = None,
+                  config_key: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Index entries matching all given filters, newest first"""
+        filters = {"ticker": ticker.upper() if ticker else None, "trade_date": trade_date,
+                   "decision": decision.upper() if decision else None, "model": model,
+                   "config_key": config_key}
+        filters = {k: v for k, v in filters.items() if v}
+
+        with self._lock:
+            self._refresh()
+            if not filters:
+                candidates = self._entries
+            else:
+                # Start from the smallest posting list, then check the remaining fields
+                postings = [self._by_field[k].get(v, []) for k, v in filters.items()]
+                candidates = min(postings, key=len)
+                candidates = [e for e in candidates if all(e.get(k) == v for k, v in filters.items())]
+            return [dict(e) for e in reversed(candidates[-limit:])] if limit else [dict(e) for e in reversed(candidates)]
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Full stored record for a run, or None"""
+        with self._lock:
+            self._refresh()
+            entry = self._by_id.get(run_id)
+        if entry is None:
+            return None
+        with open(self.data_path, "rb") as f:
+            f.seek(entry["offset"])
+            return json.loads(zlib.decompress(f.read(entry["length"])))
+
+    def get_latest(self, ticker: str, trade_date: Optional[str] = None,
+                   max_age_seconds: Optional[float] = None, config_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Most recent stored run for a ticker (optionally for a date and run configuration,
+        and not older than max_age_seconds)
+        """
+        runs = self.list_runs(ticker=ticker, trade_date=trade_date, config_key=config_key, limit=1)
+        if not runs:
+            return None
+        if max_age_seconds is not None and time.time() - runs[0]["created_at"] > max_age_seconds:
+            return None
+        return self.get_run(runs[0]["run_id"])
+
+run_store = RunStore()
@@ -0,0 +1,177 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import datetime
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from src.config import config
+from src.resilience import call_source
+from src.tools.market_data import clamp_end_date
+
+def _download_batch(symbols: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+    data = yf.download(symbols, start=start_date, end=end_date, group_by="column", auto_adjust=True,
+                       threads=True, progress=False)
+    if not isinstance(data.columns, pd.MultiIndex):
+        data.columns = pd.MultiIndex.from_product([data.columns, symbols])
+    return data
+
+def load_universe_bars(symbols: List[str], start_date: str, end_date: str):
+    """
+    Daily closes and volumes for a whole universe as two (date x symbol) frames,
+    downloaded in bulk batches of SCREEN_BATCH_SIZE symbols.
+    """
+    end_date = clamp_end_date(end_date)
+    closes, volumes = [], []
+    for i in range(0, len(symbols), config.SCREEN_BATCH_SIZE):
+        batch = symbols[i:i + config.SCREEN_BATCH_SIZE]
+        try:
+            # Own breaker and timeout: a slow bulk batch must not trip per-ticker price downloads
+            data = call_source("yfinance_bulk", _download_batch, batch, start_date, end_date)
+        except Exception as e:
+            print(f"Warning: could not download screening batch {batch[0]}..{batch[-1]}: {e}")
+            continue
+        closes.append(data["Close"])
+        volumes.append(data["Volume"])
+    if not closes:
+        return pd.DataFrame(), pd.DataFrame()
+    return pd.concat(closes, axis=1), pd.concat(volumes, axis=1)
+
+def compute_factors(close: pd.DataFrame, volume: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ranking factors for every symbol in one vectorized pass over the (date x symbol) panel.
+    Returns one row per symbol.
+    """
+    prices = close.to_numpy(dtype=float)
+    volumes = volume.reindex_like(close).to_numpy(dtype=float)
+    last = prices[-1]
+
+    def past(n):
+        return prices[-1 - n] if len(prices) > n else np.full(prices.shape[1], np.nan)
+
+    log_returns = np.diff(np.log(prices), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        factors = {
+            "last_close": last,
+            "momentum_20d": last / past(20) - 1,
+            "momentum_60d": last / past(60) - 1,
+            "momentum_126d": last / past(126) - 1,
+            # Short-term vs longer-term realized volatility
+            "volatility_breakout": np.nanstd(log_returns[-5:], axis=0) / np.nanstd(log_returns[-60:], axis=0),
+            # Distance above the prior 20-day high (positive = new high)
+            "price_breakout": last / np.nanmax(prices[-21:-1], axis=0) - 1,
+            "volume_spike": volumes[-1] / np.nanmean(volumes[-21:-1], axis=0),
+            "avg_dollar_volume": np.nanmean(prices[-20:] * volumes[-20:], axis=0),
+        }
+
+    # Wilder RSI for all symbols at once
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    rsi = (100 - 100 / (1 + gain / loss)).iloc[-1].to_numpy()
+    factors["rsi_14"] = rsi
+    factors["rsi_extreme"] = np.abs(rsi - 50) / 50
+
+    result = pd.DataFrame(factors, index=close.columns)
+    result["bars"] = close.notna().sum().to_numpy()
+    return result
+
+def _zscore(values: pd.Series) -> pd.Series:
+    # inf (zero volume, zero prior high, ...) would turn the mean and std into NaN for everyone
+    values = values.where(np.isfinite(values))
+    std = values.std()
+    if not std or np.isnan(std):
+        return values * 0
+    return ((values - values.mean()) / std).clip(-3, 3)
+
+def rank_universe(factors: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Composite 'worth a closer look' score: strong moves in either direction, volatility and
+    price breakouts, volume spikes and RSI extremes all rank a symbol higher.
+    """
+    weights = weights or config.SCREEN_FACTOR_WEIGHTS
+    eligible = factors[(factors["bars"] >= config.SCREEN_MIN_BARS)
+                       & (factors["last_close"] >= config.SCREEN_MIN_PRICE)
+                       & (factors["avg_dollar_volume"] >= config.SCREEN_MIN_DOLLAR_VOLUME)].copy()
+    if eligible.empty:
+        return eligible
+
+    scored = pd.DataFrame(index=eligible.index)
+    scored["momentum"] = _zscore(eligible[["momentum_20d", "momentum_60d", "momentum_126d"]].mean(axis=1)).abs()
+    scored["volatility_breakout"] = _zscore(eligible["volatility_breakout"])
+    scored["price_breakout"] = _zscore(eligible["price_breakout"].abs())
+    scored["volume_spike"] = _zscore(np.log1p(eligible["volume_spike"]))
+    scored["rsi_extreme"] = _zscore(eligible["rsi_extreme"])
+    scored = scored.fillna(0)
+
+    eligible["score"] = sum(scored[name] * weight for name, weight in weights.items())
+    eligible["bias"] = np.where(eligible["momentum_20d"] >= 0, "bullish", "bearish")
+    return eligible.sort_values("score", ascending=False)
+
+def screen_universe(symbols: List[str], trade_date: Optional[str] = None, top_k: Optional[int] = None) -> pd.DataFrame:
+    """Top-K symbols of a universe by composite score as of `trade_date` (default today)"""
+    trade_date = trade_date or datetime.date.today().isoformat()
+    top_k = top_k or config.SCREEN_TOP_K
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    start_date = (datetime.date.fromisoformat(trade_date)
+                  - datetime.timedelta(days=config.SCREEN_LOOKBACK_DAYS)).isoformat()
+    end_date = (datetime.date.fromisoformat(trade_date) + datetime.timedelta(days=1)).isoformat()
+
+    started = time.time()
+    close, volume = load_universe_bars(symbols, start_date, end_date)
+    if close.empty:
+        return pd.DataFrame()
+    ranked = rank_universe(compute_factors(close, volume))
+    print(f"Screened {len(symbols)} symbols in {time.time() - started:.1f}s, {len(ranked)} eligible")
+    return ranked.head(top_k)
+
+def analyze_top_k(ranked: pd.DataFrame, trade_date: str, max_workers: Optional[int] = None) -> List[dict]:
+    """Run the full agent pipeline for the screened symbols and store the results"""
+    from src.graph import run_pipeline
+    from src.llm_utils import get_model_label
+    from src.run_store import extract_decision, run_store
+
+    def analyze(symbol):
+        started = time.time()
+        state = run_pipeline(symbol, trade_date)
+        run_id = run_store.save_run(state, model=get_model_label(), duration_seconds=time.time() - started,
+                                    extra={"screen_score": float(ranked.loc[symbol, "score"])})
+        return {"ticker": symbol, "run_id": run_id, "decision": extract_decision(state.get("final_trade_decision", ""))}
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers or config.BACKTEST_MAX_WORKERS) as executor:
+        futures = {executor.submit(analyze, symbol): symbol for symbol in ranked.index}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception:
+                print(f"Analysis failed for {futures[future]}:")
+                traceback.print_exc()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a universe and pick the tickers worth a full analysis")
+    parser.add_argument("universe", help="File with one ticker per line")
+    parser.add_argument("--date", help="yyyy-mm-dd (default today)")
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--analyze", action="store_true", help="Run the agent pipeline for the top-K")
+    args = parser.parse_args()
+
+    with open(args.universe) as f:
+        symbols = [line.split("#")[0] for line in f]
+    trade_date = args.date or datetime.date.today().isoformat()
+    ranked = screen_universe(symbols, trade_date, args.top_k)
+    print(ranked.to_string())
+    if args.analyze and not ranked.empty:
+        print(json.dumps(analyze_top_k(ranked, trade_date), indent=2))
+
+if __name__ == "__main__":
+    main()
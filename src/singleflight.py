@@ -0,0 +1,133 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from src.config import config
+
+def run_config_key(deadline_seconds: Optional[float] = None) -> str:
+    """Fingerprint of the settings that change what a run produces (models, debate rounds, deadline)"""
+    from src.llm_utils import get_model_label
+    settings = {
+        "model": get_model_label(),
+        "debate_rounds": [config.MIN_DEBATE_ROUNDS, config.MAX_DEBATE_ROUNDS],
+        "risk_rounds": [config.MIN_RISK_DISCUSS_ROUNDS, config.MAX_RISK_DISCUSS_ROUNDS],
+        "deadline_seconds": deadline_seconds or config.DEFAULT_RUN_DEADLINE_SECONDS,
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def run_key(ticker: str, trade_date: str, config_key: str) -> str:
+    return f"{ticker.upper()}|{trade_date}|{config_key}"
+
+class BroadcastBus:
+    """
+    Event channel for a run that any number of clients watch.
+
+    Same publishing interface as RunEventBus, but publishing never blocks: a slow or departed
+    client can't stall a run that others are waiting for. To keep memory bounded, once
+    `compact_after` events have piled up the node updates among them are folded into a state
+    snapshot and the events are dropped; a client that attaches late (or falls that far behind)
+    receives the snapshot as one update event, then the events published since.
+    """
+
+    cancelled = False
+
+    def __init__(self, on_close: Optional[Callable[[], None]] = None, compact_after: Optional[int] = None):
+        self._events = []
+        self._base = 0  # number of events folded into the snapshot
+        self._snapshot: Dict[str, Any] = {}
+        self._compact_after = compact_after or config.STREAM_SNAPSHOT_INTERVAL
+        self._closed = False
+        self._cond = threading.Condition()
+        self._on_close = on_close
+
+    def _compact(self):
+        for event in self._events:
+            if event.get("type") == "update" and isinstance(event.get("data"), dict):
+                self._snapshot.update(event["data"])
+        self._base += len(self._events)
+        self._events = []
+
+    def publish(self, event: Dict[str, Any], droppable: bool = False) -> bool:
+        event.setdefault("timestamp", time.time())
+        with self._cond:
+            # Compact before appending so the latest event (e.g. 'complete') is always replayed as is
+            if len(self._events) >= self._compact_after:
+                self._compact()
+            self._events.append(event)
+            self._cond.notify_all()
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._on_close:
+            self._on_close()
+
+    def subscribe(self, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield the run's events from `offset` on (or the snapshot, if compacted) until the run closes"""
+        while True:
+            with self._cond:
+                while offset >= self._base + len(self._events) and not self._closed:
+                    self._cond.wait()
+                if offset >= self._base + len(self._events):
+                    return
+                batch = self._events[max(offset - self._base, 0):]
+                if offset < self._base and self._snapshot:
+                    batch = [{"type": "update", "node": "Snapshot", "data": dict(self._snapshot),
+                              "timestamp": time.time()}] + batch
+                offset = self._base + len(self._events)
+            yield from batch
+
+class RunFlights:
+    """
+    Single-flight registry of in-progress runs in this process: the first request for a
+    (ticker, trade_date, config) starts the run, identical requests attach to its stream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, BroadcastBus] = {}
+
+    def join(self, key: str, start: Callable[[BroadcastBus], Any]) -> Tuple[BroadcastBus, bool]:
+        """Return (bus, started): the in-progress run's bus, or a new one passed to `start`"""
+        with self._lock:
+            bus = self._flights.get(key)
+            if bus is not None:
+                return bus, False
+            bus = BroadcastBus(on_close=lambda: self._remove(key, bus))
+            self._flights[key] = bus
+        start(bus)
+        return bus, True
+
+    def _remove(self, key: str, bus: BroadcastBus):
+        # The run is already persisted when its bus closes, so later requests hit the result cache
+        with self._lock:
+            if self._flights.get(key) is bus:
+                del self._flights[key]
+
+    def in_progress(self):
+        with self._lock:
+            return list(self._flights)
+
+def cached_run_events(record: Dict[str, Any]):
+    """Replay a stored run as the events a live run would end with"""
+    data = {**record["reports"], **record["debates"]}
+    return [
+        {"type": "update", "node": "Cache", "data": data},
+        {"type": "complete", "run_id": record["run_id"], "budget": record.get("budget"), "cached": True,
+         "age_seconds": round(time.time() - record["created_at"], 1)},
+    ]
+
+def get_fresh_run(ticker: str, trade_date: str, config_key: str,
+                  max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """A stored run for the same inputs completed within the freshness window, or None"""
+    from src.run_store import run_store
+    max_age = config.RUN_RESULT_CACHE_SECONDS if max_age_seconds is None else max_age_seconds
+    if not max_age:
+        return None
+    return run_store.get_latest(ticker, trade_date=trade_date, max_age_seconds=max_age, config_key=config_key)
+
+run_flights = RunFlights()
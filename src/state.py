@@ -1,6 +1,6 @@
 from typing import TypedDict, Annotated, List
 from langgraph.graph import MessagesState
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, HumanMessage
 import operator
 
 class InvestDebateState(TypedDict):
@@ -10,6 +10,7 @@ class InvestDebateState(TypedDict):
     current_response: str
     judge_decision: str
     count: int
+    stop_reason: str
 
 class RiskDebateState(TypedDict):
     risky_history: str
@@ -22,6 +23,7 @@ class RiskDebateState(TypedDict):
     current_neutral_response: str
     judge_decision: str
     count: int
+    stop_reason: str
 
 class AgentState(MessagesState):
     company_of_interest: str
@@ -36,3 +38,41 @@ class AgentState(MessagesState):
     trader_investment_plan: str
     risk_debate_state: RiskDebateState
     final_trade_decision: str
+
+def create_initial_state(ticker: str, trade_date: str) -> dict:
+    """Empty AgentState for analyzing `ticker` as of `trade_date`"""
+    return {
+        "company_of_interest": ticker,
+        "trade_date": trade_date,
+        "sender": "User",
+        "messages": [HumanMessage(content=f"Analyze {ticker}")],
+        "market_report": "",
+        "sentiment_report": "",
+        "news_report": "",
+        "fundamentals_report": "",
+        "investment_plan": "",
+        "trader_investment_plan": "",
+        "final_trade_decision": "",
+        "investment_debate_state": {
+            "bull_history": "",
+            "bear_history": "",
+            "history": "",
+            "current_response": "",
+            "judge_decision": "",
+            "count": 0,
+            "stop_reason": ""
+        },
+        "risk_debate_state": {
+            "risky_history": "",
+            "safe_history": "",
+            "neutral_history": "",
+            "history": "",
+            "latest_speaker": "",
+            "current_risky_response": "",
+            "current_safe_response": "",
+            "current_neutral_response": "",
+            "judge_decision": "",
+            "count": 0,
+            "stop_reason": ""
+        }
+    }
@@ -0,0 +1,128 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+STREAM_MODES = ("full", "delta")
+STREAM_COMPRESSIONS = ("gzip", "zstd")
+
+def _to_jsonable(value):
+    """Normalize a node update into plain JSON types (messages etc. become strings)"""
+    return json.loads(json.dumps(value, default=str))
+
+def diff_state(previous: Any, current: Any, path: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Compute the ops that turn `previous` into `current`.
+    Strings that only grew at the end become an 'append' op carrying the new suffix,
+    nested dicts are diffed field by field, everything else that changed is a 'set'.
+    """
+    path = path or []
+    if isinstance(previous, dict) and isinstance(current, dict):
+        ops = []
+        for key, value in current.items():
+            if key not in previous:
+                ops.append({"op": "set", "path": path + [key], "value": value})
+            else:
+                ops.extend(diff_state(previous[key], value, path + [key]))
+        return ops
+
+    if previous == current:
+        return []
+
+    if (isinstance(previous, str) and isinstance(current, str)
+            and len(current) > len(previous) and current.startswith(previous)):
+        return [{"op": "append", "path": path, "value": current[len(previous):]}]
+
+    return [{"op": "set", "path": path, "value": current}]
+
+def apply_ops(state: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply delta ops to a state dict in place (reference decoder for clients)"""
+    for op in ops:
+        *parents, leaf = op["path"]
+        target = state
+        for key in parents:
+            target = target.setdefault(key, {})
+        if op["op"] == "append":
+            target[leaf] = target.get(leaf, "") + op["value"]
+        else:
+            target[leaf] = op["value"]
+    return state
+
+class EventStreamEncoder:
+    """
+    Serializes run events to NDJSON lines with sequence numbers.
+
+    In "full" mode update events carry the node's complete returned data (the original protocol).
+    In "delta" mode update events only carry the ops needed to bring the client's copy of the
+    state up to date, and a full snapshot is emitted every `snapshot_interval` update events so
+    a client can resync. In full mode every update resends whole fields (the debate history
+    grows each round), so bytes sent grow roughly quadratically with a debate's length; delta
+    mode sends each new piece of text once, plus a full snapshot every `snapshot_interval` updates.
+    """
+
+    def __init__(self, mode: str = "full", snapshot_interval: int = 20):
+        if mode not in STREAM_MODES:
+            raise ValueError(f"Unknown stream mode '{mode}'. Expected one of {STREAM_MODES}")
+        self.mode = mode
+        self.snapshot_interval = snapshot_interval
+        self.seq = 0
+        self._updates_since_snapshot = 0
+        self._state: Dict[str, Any] = {}
+
+    def _line(self, payload: Dict[str, Any]) -> str:
+        self.seq += 1
+        payload = {"seq": self.seq, **payload}
+        return json.dumps(payload, default=str) + "\n"
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        """Encode one event. Returns one or more newline-terminated JSON lines."""
+        if self.mode == "full" or payload.get("type") != "update":
+            return self._line(payload)
+
+        data = _to_jsonable(payload.get("data") or {})
+        ops = diff_state(self._state, data)
+        apply_ops(self._state, ops)
+
+        out = self._line({"type": "delta", "node": payload.get("node"), "ops": ops})
+
+        self._updates_since_snapshot += 1
+        if self.snapshot_interval and self._updates_since_snapshot >= self.snapshot_interval:
+            self._updates_since_snapshot = 0
+            out += self._line({"type": "snapshot", "state": self._state})
+        return out
+
+def get_compressor(encoding: Optional[str]):
+    """
+    Return a streaming compressor for the given content encoding, or None.
+    Each chunk is flushed so the client can decode events as soon as they arrive.
+    """
+    if not encoding:
+        return None
+    if encoding == "gzip":
+        compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH),
+                lambda: compressor.flush(zlib.Z_FINISH))
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        compressor = zstandard.ZstdCompressor().compressobj()
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                lambda: compressor.flush())
+    raise ValueError(f"Unsupported compression '{encoding}'. Expected one of {STREAM_COMPRESSIONS}")
+
+def compress_stream(lines: Iterable[str], compressor=None) -> Iterator[bytes]:
+    """Wrap an NDJSON line generator with a compressor from get_compressor (None = plain)"""
+    if compressor is None:
+        for line in lines:
+            yield line.encode("utf-8")
+        return
+
+    compress, finish = compressor
+    for line in lines:
+        chunk = compress(line.encode("utf-8"))
+        if chunk:
+            yield chunk
+    tail = finish()
+    if tail:
+        yield tail
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+RETURN_HORIZONS = [1, 5, 20, 60, 120, 252]  # trading days
+TRADING_DAYS = 252
+
+def _fmt(value, pct=False, digits=2):
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return "n/a"
+    return f"{value * 100:.{digits}f}%" if pct else f"{value:.{digits}f}"
+
+def _last(series: pd.Series):
+    series = series.dropna()
+    return float(series.iloc[-1]) if len(series) else None
+
+def _crossed(diff: pd.Series, lookback: int):
+    """'up'/'down' if `diff` changed sign within the last `lookback` bars, else None"""
+    sign = np.sign(diff.dropna().to_numpy()[-(lookback + 1):])
+    changes = np.flatnonzero(np.diff(sign) != 0)
+    if not len(changes):
+        return None
+    return "up" if sign[changes[-1] + 1] > 0 else "down"
+
+def price_features(df: pd.DataFrame) -> dict:
+    """Fixed-size set of return, risk, trend and volume features from daily OHLCV bars"""
+    close = df["Close"].astype(float)
+    volume = df["Volume"].astype(float)
+    prices = close.to_numpy()
+    n = len(prices)
+
+    features = {"last_date": df.index[-1].strftime("%Y-%m-%d"), "last_close": prices[-1], "bars": n}
+
+    # Returns over several horizons in one vectorized pass
+    horizons = np.array(RETURN_HORIZONS)
+    valid = horizons < n
+    past = np.full(len(horizons), np.nan)
+    past[valid] = prices[n - 1 - horizons[valid]]
+    for h, r in zip(horizons, prices[-1] / past - 1):
+        features[f"return_{h}d"] = r
+
+    log_returns = np.diff(np.log(prices))
+    for window in (20, 60):
+        tail = log_returns[-window:]
+        features[f"volatility_{window}d_annualized"] = (tail.std(ddof=1) * np.sqrt(TRADING_DAYS)
+                                                        if len(tail) > 1 else np.nan)
+
+    running_max = np.maximum.accumulate(prices)
+    drawdowns = prices / running_max - 1
+    features["max_drawdown"] = drawdowns.min()
+    features["current_drawdown"] = drawdowns[-1]
+    year = prices[-TRADING_DAYS:]
+    features["pct_from_52w_high"] = prices[-1] / year.max() - 1
+    features["pct_from_52w_low"] = prices[-1] / year.min() - 1
+
+    sma50 = close.rolling(50).mean()
+    sma200 = close.rolling(200).mean()
+    last50, last200 = _last(sma50), _last(sma200)
+    features["above_sma50"] = None if last50 is None else bool(prices[-1] > last50)
+    features["above_sma200"] = None if last200 is None else bool(prices[-1] > last200)
+    features["sma50_slope_20d"] = (last50 / sma50.dropna().iloc[-21] - 1) if sma50.notna().sum() > 20 else np.nan
+    features["sma50_200_cross_20d"] = _crossed(sma50 - sma200, 20)
+
+    if features["above_sma50"] and features["above_sma200"] and (last200 is None or last50 > last200):
+        features["trend_regime"] = "uptrend"
+    elif features["above_sma50"] is False and features["above_sma200"] is False:
+        features["trend_regime"] = "downtrend"
+    else:
+        features["trend_regime"] = "range/transition"
+    vol20, vol60 = features["volatility_20d_annualized"], features["volatility_60d_annualized"]
+    features["volatility_regime"] = ("expanding" if vol20 > 1.2 * vol60 else "contracting" if vol20 < 0.8 * vol60
+                                     else "stable") if np.isfinite(vol20) and np.isfinite(vol60) else "n/a"
+
+    vol_avg = volume.rolling(20).mean()
+    vol_std = volume.rolling(20).std()
+    ratio = (volume / vol_avg).to_numpy()
+    features["volume_vs_20d_avg"] = ratio[-1]
+    features["volume_zscore"] = _last((volume - vol_avg) / vol_std)
+    features["volume_spikes_20d"] = int(np.nansum(ratio[-20:] > 2.0))
+    return features
+
+def indicator_features(stock_df) -> dict:
+    """Latest indicator values plus crossover / extreme flags from a stockstats frame"""
+    close = stock_df["close"].astype(float)
+    macd, signal, rsi = stock_df["macd"], stock_df["macds"], stock_df["rsi_14"]
+    upper, lower = stock_df["boll_ub"], stock_df["boll_lb"]
+
+    features = {
+        "macd": _last(macd),
+        "macd_signal": _last(signal),
+        "macd_hist": _last(macd - signal),
+        "macd_cross_5d": _crossed(macd - signal, 5),
+        "rsi_14": _last(rsi),
+        "boll_upper": _last(upper),
+        "boll_lower": _last(lower),
+        "boll_percent_b": _last((close - lower) / (upper - lower)),
+        "close_50_sma": _last(stock_df["close_50_sma"]),
+        "close_200_sma": _last(stock_df["close_200_sma"]),
+    }
+    rsi_last = features["rsi_14"]
+    features["rsi_state"] = ("n/a" if rsi_last is None else "overbought" if rsi_last >= 70
+                             else "oversold" if rsi_last <= 30 else "neutral")
+    features["rsi_extreme_days_20d"] = int(((rsi.tail(20) >= 70) | (rsi.tail(20) <= 30)).sum())
+    return features
+
+_PCT_KEYS = ("return_", "volatility_", "drawdown", "pct_from", "slope")
+
+def format_features(title: str, features: dict) -> str:
+    """Render a feature dict as a compact 'key: value' block for the LLM"""
+    lines = [title]
+    for key, value in features.items():
+        if isinstance(value, (float, np.floating)):
+            value = _fmt(float(value), pct=any(p in key for p in _PCT_KEYS))
+        elif value is None:
+            value = "n/a"
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import pandas as pd
+import yfinance as yf
+
+from src.config import config
+from src.resilience import call_source
+
+# When set, tools must not return anything published after this date (backtests replay the past)
+_as_of_date: contextvars.ContextVar = contextvars.ContextVar("as_of_date", default=None)
+
+_symbol_locks = {}
+_symbol_locks_guard = threading.Lock()
+
+@contextmanager
+def point_in_time(trade_date: Optional[str]):
+    """Restrict market data visible to code inside the block to dates up to `trade_date`"""
+    token = _as_of_date.set(trade_date)
+    try:
+        yield
+    finally:
+        _as_of_date.reset(token)
+
+def get_as_of_date() -> Optional[str]:
+    return _as_of_date.get()
+
+def is_historical() -> bool:
+    """True inside point_in_time for a date before today (a backtest, not a live run)"""
+    as_of = _as_of_date.get()
+    return bool(as_of) and as_of < datetime.date.today().isoformat()
+
+def _next_day(date_str: str) -> str:
+    return (datetime.date.fromisoformat(date_str) + datetime.timedelta(days=1)).isoformat()
+
+def clamp_end_date(end_date: str, exclusive: bool = True) -> str:
+    """
+    Clamp a tool's end date to the current as-of date.
+    yfinance treats `end` as exclusive, so by default the as-of day itself stays visible.
+    """
+    as_of = _as_of_date.get()
+    if not as_of:
+        return end_date
+    limit = _next_day(as_of) if exclusive else as_of
+    return min(end_date, limit)
+
+def _symbol_lock(symbol: str) -> threading.Lock:
+    with _symbol_locks_guard:
+        return _symbol_locks.setdefault(symbol, threading.Lock())
+
+def _cache_paths(symbol: str):
+    directory = os.path.join(config.DATA_CACHE_DIR, "prices")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{symbol}.csv"), os.path.join(directory, f"{symbol}.json")
+
+def _read_cache(symbol: str):
+    data_path, meta_path = _cache_paths(symbol)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    data = pd.read_csv(data_path, index_col=0, parse_dates=True)
+    return data, meta
+
+def _covers(meta, start_date: str, end_date: str) -> bool:
+    if meta is None or meta["start"] > start_date or meta["end"] < end_date:
+        return False
+    # Bars before the day we fetched on are final; anything later may still change
+    if end_date <= meta["fetched_on"]:
+        return True
+    return time.time() - meta["fetched_at"] < config.PRICE_CACHE_TTL_SECONDS
+
+def _download(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    data = yf.Ticker(symbol).history(start=start_date, end=end_date)
+    if data.empty:
+        # Unknown symbol or no trading days: yfinance returns a plain Index here
+        return pd.DataFrame(columns=data.columns, index=pd.DatetimeIndex([], name="Date"))
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    data.index = data.index.normalize()
+    data.index.name = "Date"
+    return data
+
+def load_price_history(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Daily OHLCV bars for [start_date, end_date) from the local cache in DATA_CACHE_DIR,
+    downloading (and widening the cached range) only when needed.
+    The end date is clamped to the current as-of date, so backtests never see the future.
+    """
+    symbol = symbol.upper()
+    end_date = clamp_end_date(end_date)
+
+    with _symbol_lock(symbol):
+        data, meta = _read_cache(symbol)
+        if not _covers(meta, start_date, end_date):
+            fetch_start = min(start_date, meta["start"]) if meta else start_date
+            fetch_end = max(end_date, meta["end"]) if meta else end_date
+            try:
+                downloaded = call_source("yfinance", _download, symbol, fetch_start, fetch_end)
+            except Exception:
+                if data is None:
+                    raise
+                # Source is down: serve whatever we cached last, even if stale
+                print(f"Warning: serving cached {symbol} prices, Yahoo Finance unavailable")
+                return data.loc[(data.index >= start_date) & (data.index < end_date)]
+            if downloaded.empty:
+                # Never cache "no bars": past ranges count as final, so it would stick forever
+                data = downloaded if data is None else data
+                return data.loc[(data.index >= start_date) & (data.index < end_date)]
+            data = downloaded
+            # Temp file + os.replace so other processes never read a half-written cache; the data
+            # goes first, as old meta over wider data is still correct
+            data_path, meta_path = _cache_paths(symbol)
+            suffix = f".{os.getpid()}.tmp"  # workers in other processes may refresh the same symbol
+            data.to_csv(data_path + suffix)
+            os.replace(data_path + suffix, data_path)
+            with open(meta_path + suffix, "w") as f:
+                json.dump({"start": fetch_start, "end": fetch_end, "fetched_at": time.time(),
+                           "fetched_on": datetime.date.today().isoformat()}, f)
+            os.replace(meta_path + suffix, meta_path)
+
+    return data.loc[(data.index >= start_date) & (data.index < end_date)]
@@ -1,10 +1,13 @@
 import os
-import yfinance as yf
 import finnhub
 import pandas as pd
 from langchain_core.tools import tool
 from stockstats import wrap as stockstats_wrap
 from typing import Annotated
+from src.events import publish_event
+from src.tools.market_data import load_price_history, clamp_end_date, get_as_of_date, is_historical
+from src.tools.features import price_features, indicator_features, format_features
+from src.resilience import call_source
 
 # Tavily tool will be initialized lazily to avoid import-time errors
 tavily_tool = None
@@ -20,18 +23,44 @@ def get_tavily_tool():
             tavily_tool = None
     return tavily_tool
 
+def _tavily_results(tool, query: str):
+    # Call the API wrapper directly: the tool itself turns every failure into a repr(e) string,
+    # which the circuit breaker would count as a success and the result cache would keep
+    raw = tool.api_wrapper.raw_results(query, tool.max_results, tool.search_depth, tool.include_domains,
+                                       tool.exclude_domains, tool.include_answer, tool.include_raw_content,
+                                       tool.include_images)
+    return tool.api_wrapper.clean_results(raw["results"])
+
+def tavily_search(query: str):
+    """Tavily search through the shared circuit breaker; errors come back as a message for the LLM"""
+    if is_historical():
+        # Web search can't be limited to what was published by a past date: no lookahead in backtests
+        return (f"Web search is unavailable for historical dates (analysis as of {get_as_of_date()}); "
+                "base the report on the price and Finnhub data.")
+    tool = get_tavily_tool()
+    if tool is None:
+        return "Tavily API not configured. Please set TAVILY_API_KEY."
+    try:
+        return call_source("tavily", _tavily_results, tool, query, cache_key=f"tavily:{query}")
+    except Exception as e:
+        return f"Error searching Tavily: {e}"
+
 @tool
 def get_yfinance_data(
     symbol: Annotated[str, "ticker symbol of the company"],
     start_date: Annotated[str, "Start date in yyyy-mm-dd format"],
     end_date: Annotated[str, "End date in yyyy-mm-dd format"],
+    raw: Annotated[bool, "Return raw OHLCV rows instead of the feature summary"] = False,
 ) -> str:
-    """Retrieve the stock price data for a given ticker symbol from Yahoo Finance."""
+    """Retrieve a compact summary of the stock's price history (returns, volatility, drawdown, trend, volume) from Yahoo Finance. Set raw=True for the raw rows."""
+    publish_event("tool_call", tool="get_yfinance_data")
     try:
-        ticker = yf.Ticker(symbol.upper())
-        data = ticker.history(start=start_date, end=end_date)
+        data = load_price_history(symbol, start_date, end_date)
         if data.empty:
             return f"No data found for symbol '{symbol}' between {start_date} and {end_date}"
+
+        if not raw:
+            return format_features(f"Price summary for {symbol.upper()} ({start_date} to {end_date}):", price_features(data))
         
         # Truncate if too large to avoid token limits
         if len(data) > 50:
@@ -46,13 +75,17 @@ def get_technical_indicators(
     symbol: Annotated[str, "ticker symbol of the company"],
     start_date: Annotated[str, "Start date in yyyy-mm-dd format"],
     end_date: Annotated[str, "End date in yyyy-mm-dd format"],
+    raw: Annotated[bool, "Return the last 5 rows of raw indicator values instead of the summary"] = False,
 ) -> str:
-    """Retrieve key technical indicators for a stock using stockstats library."""
+    """Retrieve key technical indicators (MACD, RSI, Bollinger Bands, SMAs) and crossover signals for a stock using stockstats library. Set raw=True for the raw rows."""
+    publish_event("tool_call", tool="get_technical_indicators")
     try:
-        df = yf.download(symbol, start=start_date, end=end_date, progress=False)
+        df = load_price_history(symbol, start_date, end_date)
         if df.empty:
             return "No data to calculate indicators."
         stock_df = stockstats_wrap(df)
+        if not raw:
+            return format_features(f"Technical indicators for {symbol.upper()} as of {df.index[-1]:%Y-%m-%d}:", indicator_features(stock_df))
         indicators = stock_df[['macd', 'rsi_14', 'boll', 'boll_ub', 'boll_lb', 'close_50_sma', 'close_200_sma']]
         return indicators.tail().to_csv() # Return last 5 days for brevity
     except Exception as e:
@@ -61,13 +94,16 @@ def get_technical_indicators(
 @tool
 def get_finnhub_news(ticker: str, start_date: str, end_date: str) -> str:
     """Get company news from Finnhub within a date range."""
+    publish_event("tool_call", tool="get_finnhub_news")
     try:
         api_key = os.environ.get("FINNHUB_API_KEY")
         if not api_key:
             return "FINNHUB_API_KEY not found."
             
         finnhub_client = finnhub.Client(api_key=api_key)
-        news_list = finnhub_client.company_news(ticker, _from=start_date, to=end_date)
+        end_date = clamp_end_date(end_date, exclusive=False)
+        news_list = call_source("finnhub", finnhub_client.company_news, ticker, _from=start_date, to=end_date,
+                                cache_key=f"finnhub:{ticker.upper()}:{start_date}:{end_date}")
         news_items = []
         for news in news_list[:5]: # Limit to 5 results
             news_items.append(f"Headline: {news['headline']}\nSummary: {news['summary']}")
@@ -78,29 +114,23 @@ def get_finnhub_news(ticker: str, start_date: str, end_date: str) -> str:
 @tool
 def get_social_media_sentiment(ticker: str, trade_date: str) -> str:
     """Performs a live web search for social media sentiment regarding a stock."""
-    tool = get_tavily_tool()
-    if tool is None:
-        return "Tavily API not configured. Please set TAVILY_API_KEY."
+    publish_event("tool_call", tool="get_social_media_sentiment")
     query = f"social media sentiment and discussions for {ticker} stock around {trade_date}"
-    return tool.invoke({"query": query})
+    return tavily_search(query)
 
 @tool
 def get_fundamental_analysis(ticker: str, trade_date: str) -> str:
     """Performs a live web search for recent fundamental analysis of a stock."""
-    tool = get_tavily_tool()
-    if tool is None:
-        return "Tavily API not configured. Please set TAVILY_API_KEY."
+    publish_event("tool_call", tool="get_fundamental_analysis")
     query = f"fundamental analysis and key financial metrics for {ticker} stock published around {trade_date}"
-    return tool.invoke({"query": query})
+    return tavily_search(query)
 
 @tool
 def get_macroeconomic_news(trade_date: str) -> str:
     """Performs a live web search for macroeconomic news relevant to the stock market."""
-    tool = get_tavily_tool()
-    if tool is None:
-        return "Tavily API not configured. Please set TAVILY_API_KEY."
+    publish_event("tool_call", tool="get_macroeconomic_news")
     query = f"macroeconomic news and market trends affecting the stock market on {trade_date}"
-    return tool.invoke({"query": query})
+    return tavily_search(query)
 
 class Toolkit:
     def __init__(self):
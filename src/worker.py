@@ -0,0 +1,102 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import multiprocessing
+import threading
+import time
+import traceback
+
+from src.config import config
+from src.events import RunEventBus, start_run_thread
+from src.jobs import JobQueue, worker_name
+
+def run_job(queue: JobQueue, job: dict):
+    """Run one claimed job, storing every event it publishes and keeping its lease alive"""
+    job_id = job["job_id"]
+    params = job["params"]
+    print(f"[{worker_name()}] running job {job_id}: {job['ticker']} {job['trade_date']} (attempt {job['attempts']})")
+
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        # Separate thread: a single LLM call can outlast the lease
+        heartbeat_queue = JobQueue(queue.path)
+        while not stop_heartbeat.wait(config.JOB_LEASE_SECONDS / 4):
+            heartbeat_queue.heartbeat(job_id)
+
+    from src.graph import stream_pipeline
+    from src.singleflight import cached_run_events, get_fresh_run, run_config_key
+
+    # An identical run may have finished while this job was queued (unless the job asked for a fresh run)
+    config_key = params.get("config_key") or run_config_key(params.get("deadline_seconds"))
+    max_age = params.get("max_age_seconds")
+    cached = get_fresh_run(job["ticker"], job["trade_date"], config_key, max_age) if max_age != 0 else None
+    if cached:
+        for event in cached_run_events(cached):
+            queue.append_event(job_id, event)
+        queue.finish(job_id, cached["run_id"])
+        return
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    bus = RunEventBus()
+    start_run_thread(bus, stream_pipeline, bus, job["ticker"], job["trade_date"],
+                     params.get("deadline_seconds"), config_key, params.get("incremental"))
+    try:
+        run_id, error = None, "run ended without a result"
+        for event in bus:
+            queue.append_event(job_id, event)
+            if event.get("type") == "complete":
+                run_id, error = event.get("run_id"), None
+            elif event.get("type") == "error":
+                error = event.get("error")
+        if run_id:
+            queue.finish(job_id, run_id)
+        else:
+            queue.fail(job_id, error)
+    finally:
+        bus.cancel()
+        stop_heartbeat.set()
+
+def work(poll_interval: float = None, max_jobs: int = None):
+    """Worker process loop: claim and run jobs one at a time"""
+    queue = JobQueue()
+    poll_interval = poll_interval or config.JOB_POLL_INTERVAL_SECONDS
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        try:
+            job = queue.claim(worker_name())
+        except Exception:
+            traceback.print_exc()
+            job = None
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            run_job(queue, job)
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job["job_id"], str(e))
+        done += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued analysis jobs")
+    parser.add_argument("--processes", type=int, default=config.WORKER_PROCESSES,
+                        help="Worker processes on this host (each runs one job at a time)")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs per process")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        work(max_jobs=args.max_jobs)
+        return
+    processes = [multiprocessing.Process(target=work, kwargs={"max_jobs": args.max_jobs}, daemon=False)
+                 for _ in range(args.processes)]
+    for p in processes:
+        p.start()
+    print(f"Started {len(processes)} workers on {config.JOB_DB_PATH}")
+    for p in processes:
+        p.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from src.debate_control import DebateController, classify_stance
+
+BULL = """The growth story is intact: revenue is accelerating and margins are expanding.
+Accumulating here gives long-term holders the upside the bears keep ignoring.
+STANCE: **BUY**"""
+
+# Quotes and rebuts the bull case, full of "buy", "long" and "upside"
+BEAR = """My opponent says "buy the dip, the upside is obvious" and calls this a long-term winner.
+The bullish upside case ignores a stretched valuation, and buying here means going long into
+slowing demand. I would not buy.
+STANCE: **SELL**"""
+
+def _history(*turns):
+    return "".join(f"\n{speaker}: {text}" for speaker, text in turns)
+
+def _controller(max_rounds=3):
+    return DebateController(["Bull Analyst", "Bear Analyst"], min_rounds=1, max_rounds=max_rounds)
+
+def test_stance_comes_from_the_closing_line():
+    assert classify_stance(BULL) == "BUY"
+    assert classify_stance(BEAR) == "SELL"
+    assert classify_stance("Buy, buy, buy. Strong upside, go long.") is None
+
+def test_rebuttal_quoting_the_other_side_is_not_consensus():
+    history = _history(("Bull Analyst", BULL), ("Bear Analyst", BEAR))
+    assert _controller().assess(history, 2) == ""
+
+BULL_2 = """Cash flow covers the buyback twice over and guidance was raised again this quarter.
+STANCE: **BUY**"""
+
+BEAR_2 = """Fair point on the raised guidance; the balance sheet is stronger than I credited.
+STANCE: **BUY**"""
+
+def test_consensus_needs_the_same_stance_in_consecutive_rounds():
+    bear_buy = BEAR.replace("STANCE: **SELL**", "STANCE: **BUY**")
+    one_round = _history(("Bull Analyst", BULL), ("Bear Analyst", bear_buy))
+    assert _controller().assess(one_round, 2) == ""
+
+    flipped = _history(("Bull Analyst", BULL), ("Bear Analyst", BEAR),
+                       ("Bull Analyst", BULL_2), ("Bear Analyst", BEAR_2))
+    assert _controller().assess(flipped, 4) == ""
+
+    agreed = _history(("Bull Analyst", BULL), ("Bear Analyst", bear_buy),
+                      ("Bull Analyst", BULL_2), ("Bear Analyst", BEAR_2))
+    assert _controller().assess(agreed, 4).startswith("consensus: all debaters recommend BUY")